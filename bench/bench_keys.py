@@ -0,0 +1,48 @@
+"""
+Measure how encoding time scales with the number of property keys and
+features.
+
+  $ python bench/bench_keys.py
+
+With an O(1) key table the time per (feature x key) stays flat as either
+dimension grows.
+"""
+
+import time
+
+from geobuf import Encoder
+
+
+def make_collection(num_features, num_keys):
+    keys = ['key_%d' % k for k in range(num_keys)]
+    return {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [i * 0.001, i * 0.002]},
+            'properties': {key: i for key in keys},
+        } for i in range(num_features)],
+    }
+
+
+def measure(num_features, num_keys, repeat=3):
+    collection = make_collection(num_features, num_keys)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Encoder().encode(collection)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print('%10s %6s %10s %14s' % ('features', 'keys', 'seconds', 'us/prop'))
+    for num_features in (1000, 10000):
+        for num_keys in (5, 20, 80):
+            seconds = measure(num_features, num_keys)
+            per_prop = seconds / (num_features * num_keys) * 1e6
+            print('%10d %6d %10.4f %14.3f' % (num_features, num_keys, seconds, per_prop))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Measure the per-message overhead of encoding and decoding many small
+Feature and Geometry messages, one call at a time and in batches.
+
+  $ python bench/bench_overhead.py
+
+Times are microseconds per message, the best of several runs.
+"""
+
+import timeit
+
+import geobuf
+
+FEATURE = {
+    'type': 'Feature',
+    'id': 1,
+    'geometry': {'type': 'Point', 'coordinates': [12.4924, 41.8902]},
+    'properties': {'name': 'Colosseum', 'visitors': 7400000},
+}
+GEOMETRY = {'type': 'LineString', 'coordinates': [[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]]}
+
+
+def per_message(func, count, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) / count * 1e6
+
+
+def main(count=10000):
+    print('%-10s %-10s %12s %12s' % ('message', 'operation', 'per call', 'batch'))
+    for name, obj in (('Feature', FEATURE), ('Geometry', GEOMETRY)):
+        objects = [obj] * count
+        pbf = geobuf.encode(obj)
+        buffers = [pbf] * count
+        print('%-10s %-10s %10.2fus %10.2fus' % (
+            name, 'encode',
+            per_message(lambda: [geobuf.encode(o) for o in objects], count),
+            per_message(lambda: geobuf.encode_many(objects), count)))
+        for backend in geobuf.decoders:
+            print('%-10s %-10s %10.2fus %10.2fus' % (
+                name, 'decode' if backend == 'protobuf' else backend,
+                per_message(lambda: [geobuf.decode(b, backend=backend) for b in buffers], count),
+                per_message(lambda: geobuf.decode_many(buffers, backend=backend), count)))
+
+
+if __name__ == '__main__':
+    main()
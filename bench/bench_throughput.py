@@ -0,0 +1,203 @@
+"""
+Measure encode and decode throughput on the synthetic datasets of
+datasets.py, in process and through the command line interface.
+
+  $ python bench/bench_throughput.py --scale 0.1 --output before.json
+  $ python bench/bench_throughput.py --scale 0.1 --output after.json
+  $ python bench/bench_throughput.py --compare before.json after.json
+
+Every dataset and operation runs in a fresh process, so peak RSS is that of
+the one case. Reported per case:
+
+- features/s and MB/s, where MB are megabytes of geobuf data written or read
+- peak RSS in MB, and the RSS once the input data was ready
+- geobuf bytes per coordinate position
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import datasets
+
+operations = ('encode', 'decode', 'cli-encode', 'cli-decode')
+CLI = 'from geobuf.scripts.cli import cli; cli()'
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Return the peak resident set size in megabytes."""
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1 << 20) if sys.platform == 'darwin' else rss / (1 << 10)
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_case(dataset, operation, scale, repeat):
+    """Run one benchmark case in this process and return its results."""
+    import geobuf
+
+    data = datasets.datasets[dataset](scale)
+    num_features = len(data['features'])
+    num_positions = sum(datasets.count_positions(f['geometry']) for f in data['features'])
+    pbf = geobuf.Encoder().encode(data) if operation != 'encode' else None
+    input_rss = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if operation == 'encode':
+            result = []
+            seconds = best_time(lambda: result.append(geobuf.Encoder().encode(data)), repeat)
+            pbf = result[0]
+        elif operation == 'decode':
+            seconds = best_time(lambda: geobuf.Decoder().decode(pbf), repeat)
+        elif operation == 'cli-encode':
+            path = os.path.join(tmp, 'input.json')
+            with open(path, 'w') as f:
+                json.dump(data, f)
+            seconds = best_time(lambda: run_cli(['encode'], path), repeat)
+        elif operation == 'cli-decode':
+            path = os.path.join(tmp, 'input.pbf')
+            with open(path, 'wb') as f:
+                f.write(pbf)
+            seconds = best_time(lambda: run_cli(['decode'], path), repeat)
+        else:
+            raise ValueError("Unknown operation %r" % operation)
+
+    if operation.startswith('cli-'):
+        peak = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    else:
+        peak = peak_rss_mb()
+
+    return {
+        'dataset': dataset,
+        'operation': operation,
+        'features': num_features,
+        'positions': num_positions,
+        'geobuf_bytes': len(pbf),
+        'seconds': seconds,
+        'features_per_sec': num_features / seconds,
+        'mb_per_sec': len(pbf) / seconds / 1e6,
+        'peak_rss_mb': peak,
+        'input_rss_mb': input_rss,
+        'bytes_per_coord': len(pbf) / num_positions if num_positions else None,
+    }
+
+
+def run_cli(args, path):
+    with open(path, 'rb') as stdin, open(os.devnull, 'wb') as stdout:
+        subprocess.run([sys.executable, '-c', CLI] + args, stdin=stdin, stdout=stdout, check=True)
+
+
+def metadata(scale, repeat):
+    import google.protobuf
+    from google.protobuf.internal import api_implementation
+
+    import geobuf
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def git(*args):
+        try:
+            return subprocess.run(('git',) + args, cwd=root, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'geobuf': geobuf.__version__,
+        'python': platform.python_version(),
+        'protobuf': '%s (%s)' % (google.protobuf.__version__, api_implementation.Type()),
+        'platform': platform.platform(),
+        'scale': scale,
+        'repeat': repeat,
+    }
+
+
+def print_header():
+    print('%-12s %-11s %10s %12s %9s %10s %11s' % (
+        'dataset', 'operation', 'features', 'features/s', 'MB/s', 'peak RSS', 'bytes/coord'))
+
+
+def print_result(r):
+    print('%-12s %-11s %10d %12.0f %9.2f %8.0fMB %11s' % (
+        r['dataset'], r['operation'], r['features'], r['features_per_sec'], r['mb_per_sec'], r['peak_rss_mb'],
+        '%.2f' % r['bytes_per_coord'] if r['bytes_per_coord'] is not None else '-'), flush=True)
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    for name, run in (('old', old), ('new', new)):
+        meta = run['metadata']
+        commit = (meta['commit'] or 'unknown')[:12] + (' (dirty)' if meta['dirty'] else '')
+        print('%s: %s, scale %s, %s' % (name, commit, meta['scale'], meta['date']))
+    if old['metadata']['scale'] != new['metadata']['scale']:
+        print('warning: the runs use different scales')
+
+    old_results = {(r['dataset'], r['operation']): r for r in old['results']}
+    print('%-12s %-11s %12s %12s %8s %10s %10s' % (
+        'dataset', 'operation', 'old feat/s', 'new feat/s', 'speedup', 'old RSS', 'new RSS'))
+    for r in new['results']:
+        o = old_results.get((r['dataset'], r['operation']))
+        if o is None:
+            continue
+        print('%-12s %-11s %12.0f %12.0f %7.2fx %8.0fMB %8.0fMB' % (
+            r['dataset'], r['operation'], o['features_per_sec'], r['features_per_sec'],
+            r['features_per_sec'] / o['features_per_sec'], o['peak_rss_mb'], r['peak_rss_mb']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplier for the dataset sizes")
+    parser.add_argument('--datasets', default=','.join(datasets.datasets),
+                        help="comma separated datasets, from %s" % ', '.join(datasets.datasets))
+    parser.add_argument('--operations', default=','.join(operations),
+                        help="comma separated operations, from %s" % ', '.join(operations))
+    parser.add_argument('--repeat', type=int, default=1, help="report the best of this many runs")
+    parser.add_argument('--output', help="save the results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two saved results")
+    parser.add_argument('--run-case', nargs=2, metavar=('DATASET', 'OPERATION'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.run_case:
+        json.dump(run_case(*args.run_case, scale=args.scale, repeat=args.repeat), sys.stdout)
+        return
+
+    results = []
+    print_header()
+    for dataset in args.datasets.split(','):
+        for operation in args.operations.split(','):
+            output = subprocess.run([sys.executable, __file__, '--run-case', dataset, operation,
+                                     '--scale', str(args.scale), '--repeat', str(args.repeat)],
+                                    capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output))
+            print_result(results[-1])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': metadata(args.scale, args.repeat), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Generators of synthetic GeoJSON datasets of controlled size for the
+benchmarks. Every generator is deterministic and takes a scale factor that
+multiplies its default size:
+
+- points: a million Point features
+- lines: long LineStrings of a random walk
+- polygons: MultiPolygons with many holes
+- properties: features with many properties of mixed types
+- collections: deeply nested GeometryCollections
+"""
+
+import math
+import random
+
+
+def collection(features):
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def feature(geometry, properties=None, id=None):
+    obj = {'type': 'Feature', 'geometry': geometry, 'properties': properties or {}}
+    if id is not None:
+        obj['id'] = id
+    return obj
+
+
+def random_point(rng):
+    return [round(rng.uniform(-180, 180), 6), round(rng.uniform(-85, 85), 6)]
+
+
+def walk(rng, start, n, step=0.001):
+    """Return n points of a random walk from start."""
+    x, y = start
+    points = []
+    for i in range(n):
+        x += rng.uniform(-step, step)
+        y += rng.uniform(-step, step)
+        points.append([round(x, 6), round(y, 6)])
+    return points
+
+
+def ring(center, radius, n):
+    """Return a closed ring of n + 1 points around center."""
+    x, y = center
+    points = [[round(x + radius * math.cos(2 * math.pi * i / n), 6),
+               round(y + radius * math.sin(2 * math.pi * i / n), 6)] for i in range(n)]
+    return points + [points[0]]
+
+
+def points(scale=1.0, seed=0):
+    rng = random.Random(seed)
+    return collection([feature({'type': 'Point', 'coordinates': random_point(rng)}, id=i)
+                       for i in range(int(1000000 * scale))])
+
+
+def lines(scale=1.0, seed=0):
+    rng = random.Random(seed)
+    return collection([feature({'type': 'LineString', 'coordinates': walk(rng, random_point(rng), 10000)},
+                               {'name': 'line %d' % i})
+                       for i in range(max(1, int(100 * scale)))])
+
+
+def polygons(scale=1.0, seed=0, num_polygons=5, num_holes=20, ring_size=32):
+    rng = random.Random(seed)
+    features = []
+    for i in range(max(1, int(1000 * scale))):
+        cx, cy = random_point(rng)
+        multipolygon = []
+        for p in range(num_polygons):
+            center = [cx + p * 0.1, cy]
+            rings = [ring(center, 0.04, ring_size)]
+            for h in range(num_holes):
+                angle = 2 * math.pi * h / num_holes
+                rings.append(ring([center[0] + 0.025 * math.cos(angle), center[1] + 0.025 * math.sin(angle)],
+                                  0.003, ring_size // 4))
+            multipolygon.append(rings)
+        features.append(feature({'type': 'MultiPolygon', 'coordinates': multipolygon}, {'id': i}))
+    return collection(features)
+
+
+def properties(scale=1.0, seed=0, num_properties=50):
+    rng = random.Random(seed)
+    words = ['residential', 'primary', 'secondary', 'tertiary', 'service', 'track', 'path']
+    features = []
+    for i in range(int(100000 * scale)):
+        props = {}
+        for k in range(num_properties):
+            kind = k % 5
+            if kind == 0:
+                props['name_%d' % k] = rng.choice(words)
+            elif kind == 1:
+                props['count_%d' % k] = rng.randrange(-1000, 100000)
+            elif kind == 2:
+                props['value_%d' % k] = round(rng.uniform(0, 1000), 3)
+            elif kind == 3:
+                props['flag_%d' % k] = rng.random() < 0.5
+            else:
+                props['tags_%d' % k] = {'source': rng.choice(words), 'rank': rng.randrange(10)}
+        features.append(feature({'type': 'Point', 'coordinates': random_point(rng)}, props, id=i))
+    return collection(features)
+
+
+def collections(scale=1.0, seed=0, depth=8):
+    rng = random.Random(seed)
+
+    def nested(level):
+        geometries = [{'type': 'Point', 'coordinates': random_point(rng)},
+                      {'type': 'LineString', 'coordinates': walk(rng, random_point(rng), 10)}]
+        if level:
+            geometries.append(nested(level - 1))
+        return {'type': 'GeometryCollection', 'geometries': geometries}
+
+    return collection([feature(nested(depth), {'depth': depth}) for i in range(int(10000 * scale))])
+
+
+datasets = {
+    'points': points,
+    'lines': lines,
+    'polygons': polygons,
+    'properties': properties,
+    'collections': collections,
+}
+
+
+def count_positions(geometry):
+    """Return the number of positions in a GeoJSON geometry."""
+    if geometry['type'] == 'GeometryCollection':
+        return sum(count_positions(g) for g in geometry['geometries'])
+    coords = geometry['coordinates']
+    depth = {'Point': 0, 'MultiPoint': 1, 'LineString': 1, 'MultiLineString': 2, 'Polygon': 2,
+             'MultiPolygon': 3}[geometry['type']]
+    items = [coords]
+    for i in range(depth):
+        items = [item for group in items for item in group]
+    return len(items)
@@ -1,12 +1,46 @@
-from .encode import Encoder
+from .encode import Encoder, FeatureCollectionWriter
 from .decode import Decoder
+from .cache import DecodeCache
+from .compact import CompactDecoder
+from .index import FeatureIndex, IndexedReader
+from .stats import Stats
+from .wiredecode import WireDecoder
+from .aio import decode_async, encode_async
 
 __version__ = '2.0.0'
 
 
-def encode(*args):
-    return Encoder().encode(*args)
+def encode(*args, **kwargs):
+    return Encoder().encode(*args, **kwargs)
 
 
-def decode(*args):
-    return Decoder().decode(*args)
+def encode_many(*args, **kwargs):
+    return Encoder().encode_many(*args, **kwargs)
+
+
+def encode_stream(*args, **kwargs):
+    return Encoder().encode_stream(*args, **kwargs)
+
+
+decoders = {
+    'protobuf': Decoder,
+    'wire': WireDecoder,
+}
+
+
+def decoder_class(backend='protobuf', compact=False):
+    if backend not in decoders:
+        raise ValueError("Unknown decoder backend %r, expected one of %s" % (backend, ', '.join(decoders)))
+    if compact:
+        if backend != 'protobuf':
+            raise ValueError("Compact output is only available with the 'protobuf' backend")
+        return CompactDecoder
+    return decoders[backend]
+
+
+def decode(*args, backend='protobuf', compact=False, **kwargs):
+    return decoder_class(backend, compact)().decode(*args, **kwargs)
+
+
+def decode_many(*args, backend='protobuf', compact=False, **kwargs):
+    return decoder_class(backend, compact)().decode_many(*args, **kwargs)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Encode and decode geobufs without blocking an asyncio event loop.
+
+Encoded data is read from a stream, such as an asyncio.StreamReader, in
+chunks and parsed incrementally. Features are decoded in batches in an
+executor as soon as their bytes have arrived, so only the features that
+are not yet complete or decoded are held in memory:
+
+    async for feature in geobuf.aio.iter_features(request.content):
+        ...
+
+    geojson = await geobuf.decode_async(reader)
+"""
+
+import asyncio
+import functools
+
+from . import geobuf_pb2, wire
+from .decode import Decoder
+from .encode import Encoder
+from .parallel import _decoder
+
+CHUNK_SIZE = 1 << 16
+
+
+async def encode_async(data_json, executor=None, **options):
+    """Encode GeoJSON like Encoder.encode in executor (the event loop's
+    default executor if None)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(Encoder().encode, data_json, **options))
+
+
+async def decode_async(stream, executor=None, chunk_size: int = CHUNK_SIZE, **options):
+    """Decode a geobuf like Decoder.decode, reading it from stream, any
+    object with an asynchronous read(n) method, or taking it as bytes.
+    Decoding runs in executor (the event loop's default executor if
+    None)."""
+    loop = asyncio.get_running_loop()
+    if isinstance(stream, (bytes, bytearray, memoryview)):
+        return await loop.run_in_executor(executor, functools.partial(Decoder().decode, stream, **options))
+
+    parser = StreamParser()
+    features = [feature async for feature in _features(stream, parser, executor, chunk_size, options)]
+    data = parser.data
+    data_type = data.WhichOneof('data_type')
+    if data_type == 'feature' and features:
+        return features[0]
+    if data_type in ('feature', 'geometry'):
+        # A Geometry, or a Feature left out by the where option, which
+        # Decoder.decode decodes to None.
+        getattr(data, data_type).MergeFromString(parser.message)
+        return await loop.run_in_executor(executor, functools.partial(
+            Decoder().decode, data.SerializeToString(), **options))
+    decoder = _decoder((list(data.keys), data.precision, data.dimensions, options))
+    obj = {'type': 'FeatureCollection', 'features': features}
+    decoder.decode_properties(parser.feature_collection.custom_properties, parser.feature_collection.values, obj)
+    return obj
+
+
+async def iter_features(stream, executor=None, chunk_size: int = CHUNK_SIZE, **options):
+    """Asynchronously yield the features of an encoded FeatureCollection
+    read from stream, any object with an asynchronous read(n) method such
+    as an asyncio.StreamReader, chunk_size bytes at a time. Features are
+    decoded in executor (the event loop's default executor if None) and
+    options are those of decode().
+
+    Features are yielded as soon as they and the keys they use have been
+    read. The keys usually precede the features, but follow them in data
+    written by FeatureCollectionWriter, whose features with properties
+    are then held until the end of the data.
+    """
+    parser = StreamParser()
+    async for feature in _features(stream, parser, executor, chunk_size, options):
+        yield feature
+    if parser.data.WhichOneof('data_type') == 'geometry':
+        raise ValueError("Expected a FeatureCollection or Feature, got a Geometry")
+
+
+async def _features(stream, parser, executor, chunk_size, options):
+    loop = asyncio.get_running_loop()
+    pending = []
+    done = False
+    while not done:
+        chunk = await stream.read(chunk_size)
+        if chunk:
+            pending.extend(parser.feed(chunk))
+        else:
+            parser.close()
+            done = True
+        if pending:
+            header = (list(parser.data.keys), parser.data.precision, parser.data.dimensions, options)
+            decoded, count = await loop.run_in_executor(executor, _decode_ready, pending, header, done)
+            del pending[:count]
+            for feature in decoded:
+                yield feature
+
+
+def _decode_ready(features, header, final=False):
+    """Decode features in order up to the first that uses a key missing
+    from the header, unless final, and return them with the number of
+    features consumed."""
+    decoder = _decoder(header)
+    num_keys = len(header[0])
+    decoded = []
+    for i, feature_bytes in enumerate(features):
+        feature = geobuf_pb2.Data.Feature.FromString(feature_bytes)
+        if not final and max_key_index(feature) >= num_keys:
+            return decoded, i
+        if decoder.feature_matches(feature):
+            decoded.append(decoder.decode_feature(feature))
+    return decoded, len(features)
+
+
+def max_key_index(message):
+    """Return the highest key index used by a Feature or Geometry message,
+    or -1 if it uses none."""
+    indexes = list(message.custom_properties[::2])
+    if isinstance(message, geobuf_pb2.Data.Feature):
+        indexes.extend(message.properties[::2])
+        indexes.append(max_key_index(message.geometry))
+    else:
+        indexes.extend(max_key_index(geometry) for geometry in message.geometries)
+    return max(indexes, default=-1)
+
+
+class StreamParser:
+    """Incremental parser of an encoded Data message.
+
+    Data is fed to it chunk by chunk. The keys, dimensions and precision
+    are collected into `data`, along with which type of object it holds,
+    the FeatureCollection's own members into `feature_collection`, and the
+    bytes of a lone Feature or Geometry into `message`, while the encoded
+    Features are returned as soon as they are complete.
+    """
+
+    def __init__(self):
+        self.data = geobuf_pb2.Data()
+        self.feature_collection = geobuf_pb2.Data.FeatureCollection()
+        self.message = None
+        self.buf = bytearray()
+        self.collection_left = 0  # bytes of the current feature_collection field still to parse
+
+    def feed(self, chunk):
+        """Parse chunk and return the list of encoded Features it completes."""
+        buf = self.buf
+        buf += chunk
+        features = []
+        pos = 0
+        while pos < len(buf):
+            start = pos
+            try:
+                key, pos = wire.decode_varint(buf, pos)
+                field_number, wire_type = key >> 3, key & 7
+                if not self.collection_left and field_number == self.data.FEATURE_COLLECTION_FIELD_NUMBER:
+                    # Descend into the collection rather than wait for all of it.
+                    self.collection_left, pos = wire.decode_varint(buf, pos)
+                    self.data.feature_collection.SetInParent()
+                    continue
+                value, pos = self.read_value(buf, pos, wire_type)
+            except IndexError:
+                pos = start
+                break
+            if self.collection_left:
+                self.collection_left -= pos - start
+                self.collection_field(field_number, wire_type, value, features)
+            else:
+                self.data_field(field_number, wire_type, value, features)
+        del buf[:pos]
+        return features
+
+    def close(self):
+        """Check that the data ended with a complete message."""
+        if self.buf or self.collection_left:
+            raise ValueError("Truncated geobuf data")
+
+    @staticmethod
+    def read_value(buf, pos, wire_type):
+        """Read a field value at pos like wire.iter_fields does, returning
+        the payload of other than varint fields as bytes, and raise
+        IndexError if it is not complete yet."""
+        if wire_type == wire.VARINT:
+            return wire.decode_varint(buf, pos)
+        if wire_type == wire.LENGTH_DELIMITED:
+            length, pos = wire.decode_varint(buf, pos)
+        elif wire_type == wire.FIXED64:
+            length = 8
+        elif wire_type == wire.FIXED32:
+            length = 4
+        else:
+            raise ValueError("Unsupported wire type %d" % wire_type)
+        if pos + length > len(buf):
+            raise IndexError("incomplete field")
+        return bytes(buf[pos:pos + length]), pos + length
+
+    def data_field(self, field_number, wire_type, value, features):
+        data = self.data
+        if field_number == data.KEYS_FIELD_NUMBER:
+            data.keys.append(value.decode('utf-8'))
+        elif field_number == data.DIMENSIONS_FIELD_NUMBER:
+            data.dimensions = value
+        elif field_number == data.PRECISION_FIELD_NUMBER:
+            data.precision = value
+        elif field_number == data.FEATURE_FIELD_NUMBER:
+            data.feature.SetInParent()
+            self.message = value
+            features.append(value)
+        elif field_number == data.GEOMETRY_FIELD_NUMBER:
+            data.geometry.SetInParent()
+            self.message = value
+
+    def collection_field(self, field_number, wire_type, value, features):
+        feature_collection = self.feature_collection
+        if field_number == feature_collection.FEATURES_FIELD_NUMBER:
+            features.append(value)
+        elif field_number == feature_collection.VALUES_FIELD_NUMBER:
+            feature_collection.values.add().MergeFromString(value)
+        elif field_number == feature_collection.CUSTOM_PROPERTIES_FIELD_NUMBER:
+            if wire_type == wire.VARINT:
+                feature_collection.custom_properties.append(value)
+            else:
+                feature_collection.custom_properties.extend(wire.decode_packed(value, 0, len(value)))
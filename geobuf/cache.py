@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+A least recently used cache of decoded geobufs.
+
+Results are frozen, with dicts as FrozenDicts and lists as tuples, so one
+cached result can be handed to any number of threads without copying:
+
+    cache = DecodeCache(max_bytes=256 << 20)
+    geojson = cache.decode(pbf)
+    geojson = cache.decode(pbf, key=tile_id)  # skips hashing pbf
+
+`thaw` returns a mutable copy of a frozen result.
+"""
+
+import collections
+import hashlib
+import sys
+import threading
+
+from .decode import Decoder
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses evictions entries bytes max_bytes')
+
+
+class FrozenDict(dict):
+    """A dict that cannot be changed after it is made."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("%s is immutable" % type(self).__name__)
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, dict.__repr__(self))
+
+
+class DecodeCache:
+    """Decode geobufs, keeping up to max_bytes of results, by their
+    approximate size in memory, and evicting the least recently used.
+
+    Entries are keyed by the BLAKE2b hash of the encoded data or by a key
+    given by the caller. Options are those of decode() and apply to every
+    entry; decoder is the class decoding the data, Decoder or WireDecoder.
+    The cache may be shared between threads. Data missing from the cache is
+    decoded outside of its lock, so two threads may both decode it.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, decoder=Decoder, **options):
+        self.max_bytes = max_bytes
+        self.decoder = decoder
+        self.options = options
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = collections.OrderedDict()  # key -> (result, size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data_str: bytes):
+        """Return the cache key of encoded data."""
+        return hashlib.blake2b(data_str, digest_size=16).digest()
+
+    def decode(self, data_str: bytes, key=None):
+        """Return the frozen result of decoding data_str, from the cache if
+        it holds the data's key."""
+        if key is None:
+            key = self.key(data_str)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        result, size = freeze(self.decoder().decode(data_str, **self.options))
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (result, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    old_result, old_size = self._entries.popitem(last=False)[1]
+                    self.bytes -= old_size
+                    self.evictions += 1
+        return result
+
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self._entries), self.bytes, self.max_bytes)
+
+    def clear(self):
+        """Empty the cache and reset its counts."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.bytes = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def freeze(obj):
+    """Return an immutable copy of a decoded object, with FrozenDicts for
+    dicts, tuples for lists and read-only NumPy arrays, along with its
+    approximate size in bytes."""
+    if isinstance(obj, dict):
+        frozen = {}
+        size = 0
+        for key, value in obj.items():
+            frozen[key], value_size = freeze(value)
+            size += sys.getsizeof(key) + value_size
+        frozen = FrozenDict(frozen)
+        return frozen, size + sys.getsizeof(frozen)
+    if isinstance(obj, list):
+        items = [freeze(item) for item in obj]
+        frozen = tuple(item for item, size in items)
+        return frozen, sys.getsizeof(frozen) + sum(size for item, size in items)
+    if np is not None and isinstance(obj, np.ndarray):
+        obj = obj.view()
+        obj.flags.writeable = False
+        return obj, sys.getsizeof(obj) + obj.nbytes
+    return obj, sys.getsizeof(obj)
+
+
+def thaw(obj):
+    """Return a mutable copy of a frozen object, with dicts and lists."""
+    if isinstance(obj, dict):
+        return {key: thaw(value) for key, value in obj.items()}
+    if isinstance(obj, tuple):
+        return [thaw(item) for item in obj]
+    if np is not None and isinstance(obj, np.ndarray):
+        return obj.copy()
+    return obj
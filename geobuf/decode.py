@@ -1,80 +1,452 @@
 # -*- coding: utf-8 -*-
 
 import collections
+import collections.abc
+import itertools
 import json
+from array import array
 
-from . import geobuf_pb2
+from . import geobuf_pb2, wire
+from .stats import Stats
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
 
 
 class Decoder:
     geometry_types = ('Point', 'MultiPoint', 'LineString', 'MultiLineString',
                       'Polygon', 'MultiPolygon', 'GeometryCollection')
 
-    def __init__(self):
+    # methods timed per phase when the decoder has stats
+    instrumented = {
+        'parse': 'parse',
+        'decode_feature': 'features',
+        'decode_properties': 'properties',
+        'decode_value': 'values',
+        'decode_geometry': 'geometry',
+    }
+
+    def __init__(self, stats: Stats = None):
         self.data: geobuf_pb2.Data = geobuf_pb2.Data()
         self.e: int = 1
         self.dim: int = 2
-
-    def decode(self, data_str: bytes):
-
-        data = self.data = geobuf_pb2.Data()
-        data.ParseFromString(data_str)
+        self.use_numpy: bool = False
+        self.as_arrays: bool = False
+        self.properties = None  # property names to decode, or None for all
+        self.geometry: bool = True
+        self.where = None
+        self.property_indexes = None  # key indexes of self.properties
+        self.where_indexes = None  # (key index, value) pairs of a where mapping
+        self.stats = stats
+        if stats is not None:
+            stats.instrument(self, self.instrumented)
+
+    def decode(self, data_str: bytes, **options):
+        self.configure(**options)
+        return self.decode_message(data_str)
+
+    def decode_many(self, buffers, **options):
+        """Decode each encoded Data message of an iterable separately, with
+        options set once for all of them, and return the list of results."""
+        self.configure(**options)
+        return [self.decode_message(data_str) for data_str in buffers]
+
+    def decode_message(self, data_str: bytes):
+        """Decode one encoded Data message with the current options."""
+        data = self.data = self.parse(data_str)
 
         self.e = pow(10, data.precision)
         self.dim = data.dimensions
+        self.prepare_filters(data.keys)
 
         data_type = data.WhichOneof('data_type')
 
         if data_type == 'feature_collection':
             return self.decode_feature_collection(data.feature_collection)
         elif data_type == 'feature':
-            return self.decode_feature(data.feature)
+            return self.decode_feature(data.feature) if self.feature_matches(data.feature) else None
         elif data_type == 'geometry':
+            self.check_where_geometry()
             return self.decode_geometry(data.geometry)
 
+    def check_where_geometry(self):
+        if self.where is not None:
+            raise ValueError("The where option applies to Features, got a Geometry")
+
+    def parse(self, data_str: bytes):
+        """Return the Data message encoded in data_str."""
+        # A fresh message per call: with the upb runtime a reused message
+        # keeps the memory of everything ever parsed into it.
+        data = geobuf_pb2.Data.FromString(data_str)
+        if self.stats is not None:
+            self.stats.keys += len(data.keys)
+            self.stats.bytes_read += len(data_str)
+        return data
+
+    def configure(self, use_numpy: bool = False, as_arrays: bool = False, properties=None, geometry: bool = True,
+                  where=None):
+        """Set decoding options.
+
+        properties lists the property names to decode (all by default), and
+        geometry=False decodes the geometries of features as None. where
+        keeps only the features whose properties match: either a mapping of
+        property names to required values, or a callable given a read-only
+        mapping of the feature's properties that decodes values on access.
+        A single Feature that does not match decodes to None, and where is
+        refused for a Geometry. Filtering and projection run on the encoded
+        key indexes, so skipped values and geometries are never decoded.
+        """
+        if (use_numpy or as_arrays) and np is None:
+            raise ImportError("use_numpy=True and as_arrays=True require numpy")
+
+        self.use_numpy = use_numpy or as_arrays  # decode whole geometries with numpy
+        self.as_arrays = as_arrays  # return numpy arrays instead of nested lists
+        self.properties = properties
+        self.geometry = geometry
+        self.where = where
+
+    def prepare_filters(self, keys):
+        """Resolve the property names of the filters to indexes into keys."""
+        if self.properties is None and self.where is None:
+            self.property_indexes = self.where_indexes = None
+            return
+        key_indexes = {key: i for i, key in enumerate(keys)}
+        self.property_indexes = None
+        if self.properties is not None:
+            self.property_indexes = {key_indexes[key] for key in self.properties if key in key_indexes}
+        self.where_indexes = None
+        if self.where is not None and not callable(self.where):
+            self.where_indexes = [(key_indexes.get(key), value) for key, value in self.where.items()]
+
+    def matches(self, props, value_at, keys):
+        """Return whether the key/value index pairs props satisfy the where
+        option; value_at(i) decodes value i and keys are the global keys."""
+        if self.where is None:
+            return True
+        elif self.where_indexes is None:
+            return bool(self.where(LazyProperties(keys, props, value_at)))
+        for key_index, expected in self.where_indexes:
+            for i in range(0, len(props), 2):
+                if props[i] == key_index:
+                    if value_at(props[i + 1]) != expected:
+                        return False
+                    break
+            else:
+                return False
+        return True
+
+    def feature_matches(self, feature):
+        return self.where is None or self.matches(
+            feature.properties, lambda i: self.decode_value(feature.values[i]), self.data.keys)
+
+    def iter_features(self, buffer, **options):
+        """Yield the features of an encoded FeatureCollection one at a time.
+
+        buffer may be bytes, a memoryview or an mmap. Only one Feature message
+        is parsed at a time, so memory use does not grow with the number of
+        features. Options are those of decode().
+        """
+        self.configure(**options)
+        with memoryview(buffer) as buf:
+            if self.read_header(buf).WhichOneof('data_type') == 'geometry':
+                raise ValueError("Expected a FeatureCollection or Feature, got a Geometry")
+            for start, end in self.feature_spans(buf):
+                feature = geobuf_pb2.Data.Feature.FromString(buf[start:end])
+                if self.feature_matches(feature):
+                    yield self.decode_feature(feature)
+
+    def to_columns(self, data_str: bytes, **options):
+        """Decode the features of an encoded FeatureCollection or Feature into
+        NumPy columns instead of one dict per feature.
+
+        Returns a dict with:
+
+        - 'id': masked array of feature ids, int64 when all are integers.
+        - 'properties': a masked array per property key, in key table order
+          (or in the order of the properties option), masked where a feature
+          lacks the key. The dtype follows the encoded value types: bool,
+          int64 (uint64 beyond its range), float64 for doubles and for doubles
+          mixed with integers, and object for strings, JSON and mixed types.
+        - 'members': masked object array of dicts of the other members of
+          each feature (foreign members such as '@type'), masked where a
+          feature has none.
+        - 'geometry' (unless geometry=False): GeoArrow-style offsets into
+          a contiguous (n, dim) float64 'coords' array. Each geometry has
+          parts (the polygons of a MultiPolygon, the lines of a
+          MultiLineString, otherwise one), each part has rings (the rings of
+          a polygon, otherwise one) and each ring has points; rings repeat
+          their first point at the end, as in GeoJSON. 'type' holds the
+          geometry type of each feature as an index into geometry_types, and
+          'geometry_offsets', 'part_offsets' and 'ring_offsets' index into
+          the next level down. Its 'members' holds the other members of
+          each geometry, like the feature members.
+
+        Options are those of decode(); use_numpy and as_arrays are implied.
+        GeometryCollections cannot be represented and raise ValueError.
+        """
+        if np is None:
+            raise ImportError("to_columns requires numpy")
+        self.configure(**options)
+
+        data = self.data = self.parse(data_str)
+        self.e = pow(10, data.precision)
+        self.dim = data.dimensions
+        self.prepare_filters(data.keys)
+
+        data_type = data.WhichOneof('data_type')
+        if data_type == 'feature_collection':
+            features = [feature for feature in data.feature_collection.features if self.feature_matches(feature)]
+        elif data_type == 'feature':
+            features = [data.feature]
+        else:
+            raise ValueError("Expected a FeatureCollection or Feature, got %s" % data_type)
+
+        # rows and values of every property key, indexed like data.keys
+        rows = collections.defaultdict(list)
+        values = collections.defaultdict(list)
+        value_types = collections.defaultdict(set)
+        ids = []
+        id_rows = []
+        members = []
+        member_rows = []
+        indexes = self.property_indexes
+        for row, feature in enumerate(features):
+            id_type = feature.WhichOneof('id_type')
+            if id_type is not None:
+                ids.append(getattr(feature, id_type))
+                id_rows.append(row)
+            if feature.custom_properties:
+                members.append(self.decode_properties(feature.custom_properties, feature.values))
+                member_rows.append(row)
+            props = feature.properties
+            for i in range(0, len(props), 2):
+                key_index = props[i]
+                if indexes is not None and key_index not in indexes:
+                    continue
+                val = feature.values[props[i + 1]]
+                value_type = val.WhichOneof('value_type')
+                if value_type is None:
+                    continue
+                rows[key_index].append(row)
+                values[key_index].append(self.decode_value(val))
+                value_types[key_index].add(value_type)
+
+        if self.properties is None:
+            key_indexes = sorted(rows)
+            names = [data.keys[i] for i in key_indexes]
+        else:
+            key_index_of = {key: i for i, key in enumerate(data.keys)}
+            names = list(self.properties)
+            key_indexes = [key_index_of.get(key) for key in names]
+
+        columns = {
+            'id': self.masked_column(len(features), id_rows, ids,
+                                     {'string_value' if isinstance(x, str) else 'pos_int_value' for x in ids}),
+            'properties': {name: self.masked_column(len(features), rows.get(i, []), values.get(i, []),
+                                                    value_types.get(i, set()))
+                           for name, i in zip(names, key_indexes)},
+            'members': self.masked_column(len(features), member_rows, members, {'json_value'}),
+        }
+        if self.geometry:
+            columns['geometry'] = self.geometry_columns([feature.geometry for feature in features])
+        return columns
+
+    @staticmethod
+    def masked_column(length, rows, values, value_types):
+        """Return a masked array of length with values at rows, its dtype
+        chosen from the set of encoded value types."""
+        if value_types and value_types <= {'pos_int_value', 'neg_int_value'}:
+            dtype = np.int64
+            if values and (min(values) < -1 << 63 or max(values) >= 1 << 63):
+                dtype = np.uint64 if min(values) >= 0 else np.float64
+        elif value_types and value_types <= {'pos_int_value', 'neg_int_value', 'double_value'}:
+            dtype = np.float64
+        elif value_types == {'bool_value'}:
+            dtype = np.bool_
+        else:
+            dtype = object
+
+        column = np.zeros(length, dtype=dtype) if dtype is not object else np.full(length, None, dtype=object)
+        mask = np.ones(length, dtype=np.bool_)
+        if rows:
+            rows = np.asarray(rows, dtype=np.intp)
+            if dtype is object:
+                for row, value in zip(rows.tolist(), values):
+                    column[row] = value  # keeps list and dict values whole
+            else:
+                column[rows] = values
+            mask[rows] = False
+        return np.ma.MaskedArray(column, mask=mask)
+
+    def geometry_columns(self, geometries):
+        """Return the GeoArrow-style columns of to_columns for geometries."""
+        types = []
+        parts = []  # number of parts of each geometry
+        rings = []  # number of rings of each part
+        lengths = []  # number of stored points of each ring
+        closed = []  # whether each ring repeats its first point
+        coords = array('q')
+        members = []
+        member_rows = []
+        for row, geometry in enumerate(geometries):
+            gt = self.geometry_types[geometry.type]
+            if gt == 'GeometryCollection':
+                raise ValueError("GeometryCollections cannot be decoded to columns")
+            types.append(geometry.type)
+            if geometry.custom_properties:
+                members.append(self.decode_properties(geometry.custom_properties, geometry.values))
+                member_rows.append(row)
+            coords.extend(geometry.coords)
+            ring_lengths = self.line_lengths(geometry)
+            lengths.extend(ring_lengths)
+            closed.extend([gt in ('Polygon', 'MultiPolygon')] * len(ring_lengths))
+            if gt == 'MultiLineString':
+                parts.append(len(ring_lengths))
+                rings.extend([1] * len(ring_lengths))
+            elif gt == 'MultiPolygon' and geometry.lengths:
+                parts.append(geometry.lengths[0])
+                j = 1
+                for n in range(geometry.lengths[0]):
+                    rings.append(geometry.lengths[j])
+                    j += 1 + geometry.lengths[j]
+            else:
+                parts.append(1)
+                rings.append(len(ring_lengths))
+
+        q = np.frombuffer(coords, dtype=np.int64).reshape(-1, self.dim)
+        absolute, point_counts = self.accumulate_lines(q, np.asarray(lengths, dtype=np.intp),
+                                                       np.asarray(closed, dtype=np.bool_))
+
+        def offsets(counts):
+            result = np.zeros(len(counts) + 1, dtype=np.int64)
+            np.cumsum(counts, out=result[1:])
+            return result
+
+        return {
+            'type': np.asarray(types, dtype=np.uint8),
+            'geometry_offsets': offsets(parts),
+            'part_offsets': offsets(rings),
+            'ring_offsets': offsets(point_counts),
+            'coords': absolute.astype(np.float64) / self.e,
+            'members': self.masked_column(len(types), member_rows, members, {'json_value'}),
+        }
+
+    def read_header(self, buf):
+        """Read keys, dimensions, precision and the data type from an encoded
+        Data message, skipping over everything else, and prepare to decode
+        its features."""
+        data = self.data = geobuf_pb2.Data()
+
+        # The keys may follow the features, so they are collected in a pass
+        # of their own.
+        for field_number, wire_type, value in wire.iter_fields(buf):
+            if field_number == data.KEYS_FIELD_NUMBER:
+                data.keys.append(str(buf[value[0]:value[1]], 'utf-8'))
+            elif field_number == data.DIMENSIONS_FIELD_NUMBER:
+                data.dimensions = value
+            elif field_number == data.PRECISION_FIELD_NUMBER:
+                data.precision = value
+            elif field_number == data.FEATURE_COLLECTION_FIELD_NUMBER:
+                data.feature_collection.SetInParent()
+            elif field_number == data.FEATURE_FIELD_NUMBER:
+                data.feature.SetInParent()
+            elif field_number == data.GEOMETRY_FIELD_NUMBER:
+                data.geometry.SetInParent()
+
+        self.e = pow(10, data.precision)
+        self.dim = data.dimensions
+        self.prepare_filters(data.keys)
+        if self.stats is not None:
+            self.stats.keys += len(data.keys)
+            self.stats.bytes_read += len(buf)
+        return data
+
+    def read_custom_properties(self, buf):
+        """Decode the FeatureCollection's own members from an encoded Data
+        message, skipping over its features. Call read_header first."""
+        feature_collection = geobuf_pb2.Data.FeatureCollection()
+        for field_number, wire_type, value in wire.iter_fields(buf):
+            if field_number != geobuf_pb2.Data.FEATURE_COLLECTION_FIELD_NUMBER:
+                continue
+            for field_number, wire_type, value in wire.iter_fields(buf, *value):
+                if field_number == feature_collection.VALUES_FIELD_NUMBER:
+                    feature_collection.values.add().MergeFromString(buf[value[0]:value[1]])
+                elif field_number == feature_collection.CUSTOM_PROPERTIES_FIELD_NUMBER:
+                    if wire_type == wire.VARINT:
+                        feature_collection.custom_properties.append(value)
+                    else:
+                        feature_collection.MergeFromString(
+                            wire.encode_length_delimited(field_number, buf[value[0]:value[1]]))
+        return self.decode_properties(feature_collection.custom_properties, feature_collection.values)
+
+    @staticmethod
+    def feature_spans(buf):
+        """Yield the (start, end) offsets in buf of each encoded Feature."""
+        for field_number, wire_type, value in wire.iter_fields(buf):
+            if field_number == geobuf_pb2.Data.FEATURE_FIELD_NUMBER:
+                yield value
+            elif field_number == geobuf_pb2.Data.FEATURE_COLLECTION_FIELD_NUMBER:
+                for field_number, wire_type, value in wire.iter_fields(buf, *value):
+                    if field_number == geobuf_pb2.Data.FeatureCollection.FEATURES_FIELD_NUMBER:
+                        yield value
+
     def decode_feature_collection(self, feature_collection):
         obj = {'type': 'FeatureCollection', 'features': []}
         self.decode_properties(feature_collection.custom_properties, feature_collection.values, obj)
         for feature in feature_collection.features:
-            obj['features'].append(self.decode_feature(feature))
+            if self.feature_matches(feature):
+                obj['features'].append(self.decode_feature(feature))
 
         return obj
 
     def decode_feature(self, feature):
-        obj = collections.OrderedDict()
-        obj['type'] = 'Feature'
+        obj = {'type': 'Feature'}
 
         self.decode_properties(feature.custom_properties, feature.values, obj)
 
         self.decode_id(feature, obj)
-        obj['geometry'] = self.decode_geometry(feature.geometry)
+        obj['geometry'] = self.decode_geometry(feature.geometry) if self.geometry else None
         if len(feature.properties):
-            obj['properties'] = self.decode_properties(feature.properties, feature.values)
+            obj['properties'] = self.decode_properties(feature.properties, feature.values,
+                                                       indexes=self.property_indexes)
 
         return obj
 
-    def decode_properties(self, props, values, dest=None):
+    def decode_properties(self, props, values, dest=None, indexes=None):
+        """Decode key/value index pairs into dest, skipping keys whose index
+        is not in indexes if given."""
         if dest is None:
             dest = {}
+        if not props:
+            return dest
         for i in range(0, len(props), 2):
-            key = self.data.keys[props[i]]
-            val = values[props[i + 1]]
-
-            value_type = val.WhichOneof('value_type')
-            if value_type == 'string_value':
-                dest[key] = val.string_value
-            elif value_type == 'double_value':
-                dest[key] = val.double_value
-            elif value_type == 'pos_int_value':
-                dest[key] = val.pos_int_value
-            elif value_type == 'neg_int_value':
-                dest[key] = -val.neg_int_value
-            elif value_type == 'bool_value':
-                dest[key] = val.bool_value
-            elif value_type == 'json_value':
-                dest[key] = json.loads(val.json_value)
+            if indexes is not None and props[i] not in indexes:
+                continue
+            value = self.decode_value(values[props[i + 1]])
+            if value is not None:
+                dest[self.data.keys[props[i]]] = value
         return dest
 
+    @staticmethod
+    def decode_value(val):
+        """Return the Python value of a Value message, or None if it is unset."""
+        value_type = val.WhichOneof('value_type')
+        if value_type == 'string_value':
+            return val.string_value
+        elif value_type == 'double_value':
+            return val.double_value
+        elif value_type == 'pos_int_value':
+            return val.pos_int_value
+        elif value_type == 'neg_int_value':
+            return -val.neg_int_value
+        elif value_type == 'bool_value':
+            return val.bool_value
+        elif value_type == 'json_value':
+            return json.loads(val.json_value)
+        return None
+
     @staticmethod
     def decode_id(obj, obj_json):
         id_type = obj.WhichOneof('id_type')
@@ -84,8 +456,8 @@ class Decoder:
             obj_json['id'] = obj.int_id
 
     def decode_geometry(self, geometry):
-        obj = collections.OrderedDict()
-        gt = obj['type'] = self.geometry_types[geometry.type]
+        gt = self.geometry_types[geometry.type]
+        obj = {'type': gt}
 
         self.decode_properties(geometry.custom_properties, geometry.values, obj)
 
@@ -104,15 +476,63 @@ class Decoder:
         elif gt == 'MultiPolygon':
             obj['coordinates'] = self.decode_multi_polygon(geometry)
 
+        if self.stats is not None:
+            self.stats.count_coords(gt, len(geometry.coords) // self.dim)
         return obj
 
+    def line_lengths(self, geometry):
+        """Return the number of points in each separately delta-encoded line
+        of a non-collection geometry."""
+        gt = self.geometry_types[geometry.type]
+        if gt == 'Point' or not geometry.lengths:
+            return [len(geometry.coords) // self.dim]
+        elif gt == 'MultiPolygon':
+            lengths = []
+            j = 1
+            for n in range(geometry.lengths[0]):
+                num_rings = geometry.lengths[j]
+                lengths.extend(geometry.lengths[j + 1:j + 1 + num_rings])
+                j += 1 + num_rings
+            return lengths
+        return list(geometry.lengths)
+
+    def integer_bbox(self, geometry):
+        """Return the [min x, min y, max x, max y] of a geometry in integer
+        coordinate units, or None when it has no coordinates."""
+        if self.geometry_types[geometry.type] == 'GeometryCollection':
+            boxes = [box for box in map(self.integer_bbox, geometry.geometries) if box is not None]
+            if not boxes:
+                return None
+            return [min(b[0] for b in boxes), min(b[1] for b in boxes),
+                    max(b[2] for b in boxes), max(b[3] for b in boxes)]
+
+        coords = geometry.coords[:]
+        if not coords:
+            return None
+        dim = self.dim
+        xs = []
+        ys = []
+        start = 0
+        for length in self.line_lengths(geometry):
+            end = start + length * dim
+            xs.extend(itertools.accumulate(coords[start:end:dim]))
+            ys.extend(itertools.accumulate(coords[start + 1:end:dim]))
+            start = end
+        return [min(xs), min(ys), max(xs), max(ys)]
+
     def decode_coord(self, coord):
         return float(coord) / self.e
 
     def decode_point(self, coords):
-        return [self.decode_coord(x) for x in coords]
+        if self.as_arrays:
+            return np.array(coords, dtype=np.float64) / self.e
+        e = self.e
+        return [float(x) / e for x in coords]
 
     def decode_line(self, coords, is_closed=False):
+        if self.use_numpy:
+            return self.decode_lines_numpy(coords, None, is_closed)[0]
+
         obj = []
 
         r = range(self.dim)
@@ -130,6 +550,9 @@ class Decoder:
         return obj
 
     def decode_multi_line(self, geometry, is_closed=False):
+        if self.use_numpy:
+            return self.decode_lines_numpy(geometry.coords, geometry.lengths or None, is_closed)
+
         if len(geometry.lengths) == 0:
             return [self.decode_line(geometry.coords, is_closed=is_closed)]
 
@@ -143,6 +566,25 @@ class Decoder:
         return obj
 
     def decode_multi_polygon(self, geometry):
+        if self.use_numpy and len(geometry.lengths) == 0:
+            return [self.decode_lines_numpy(geometry.coords, None, is_closed=True)]
+        elif self.use_numpy:
+            num_polygons = geometry.lengths[0]
+            num_rings = []
+            ring_lengths = []
+            j = 1
+            for n in range(num_polygons):
+                num_rings.append(geometry.lengths[j])
+                ring_lengths.extend(geometry.lengths[j + 1:j + 1 + num_rings[-1]])
+                j += 1 + num_rings[-1]
+            lines = self.decode_lines_numpy(geometry.coords, ring_lengths, is_closed=True)
+            obj = []
+            i = 0
+            for n in num_rings:
+                obj.append(lines[i:i + n])
+                i += n
+            return obj
+
         if len(geometry.lengths) == 0:
             return [[self.decode_line(geometry.coords, is_closed=True)]]
 
@@ -161,3 +603,65 @@ class Decoder:
                 i += l * self.dim
             obj.append(rings)
         return obj
+
+    def decode_lines_numpy(self, coords, lengths=None, is_closed=False):
+        """Decode delta-encoded coords into one line per entry of lengths
+        (a single line when lengths is None) with vectorized cumulative sums.
+
+        Lines are returned as (n, dim) float64 arrays when as_arrays is set,
+        and as nested lists otherwise.
+        """
+        q = np.fromiter(coords, dtype=np.int64, count=len(coords)).reshape(-1, self.dim)
+        if lengths is None:
+            lengths = [len(q)]
+        absolute, lengths = self.accumulate_lines(q, np.asarray(lengths, dtype=np.intp), is_closed)
+
+        points = absolute.astype(np.float64) / self.e
+        lines = np.split(points, (np.cumsum(lengths) - lengths)[1:])
+        if self.as_arrays:
+            return lines
+        return [line.tolist() for line in lines]
+
+    @staticmethod
+    def accumulate_lines(q, lengths, is_closed=False):
+        """Turn the (n, dim) deltas q of consecutive lines of the given
+        lengths into absolute integer coordinates.
+
+        is_closed is a bool for all lines or a boolean array per line; closed
+        lines get their first point repeated at the end. Returns the points
+        and the new line lengths.
+        """
+        starts = np.cumsum(lengths) - lengths
+
+        # every line restarts its running sum from the origin
+        absolute = np.cumsum(q, axis=0)
+        base = np.zeros((len(lengths), q.shape[1]), dtype=np.int64)
+        base[starts > 0] = absolute[starts[starts > 0] - 1]
+        absolute -= np.repeat(base, lengths, axis=0)
+
+        closed = np.broadcast_to(np.asarray(is_closed, dtype=np.bool_), lengths.shape) & (lengths > 0)
+        if closed.any():
+            absolute = np.insert(absolute, (starts + lengths)[closed], absolute[starts[closed]], axis=0)
+            lengths = lengths + closed
+        return absolute, lengths
+
+
+class LazyProperties(collections.abc.Mapping):
+    """Read-only view of a feature's properties that decodes each value
+    only when it is looked up."""
+
+    def __init__(self, keys, props, value_at):
+        self._value_indexes = {keys[props[i]]: props[i + 1] for i in range(0, len(props), 2)}
+        self._value_at = value_at
+
+    def __getitem__(self, key):
+        value = self._value_at(self._value_indexes[key])
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return iter(self._value_indexes)
+
+    def __len__(self):
+        return len(self._value_indexes)
@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
 
-import collections
+import itertools
 import json
+import tempfile
 
 from typing import Mapping
 import six
 
-from . import geobuf_pb2
+from . import geobuf_pb2, wire
+from .stats import Stats
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
 
 
 class Encoder:
@@ -20,23 +27,39 @@ class Encoder:
         'GeometryCollection': 6,
     }
 
-    def __init__(self):
+    # methods timed per phase when the encoder has stats
+    instrumented = {
+        'encode_feature': 'features',
+        'encode_properties': 'properties',
+        'encode_custom_properties': 'properties',
+        'key_index': 'keys',
+        'add_value': 'values',
+        'encode_geometry': 'geometry',
+        'serialize': 'serialize',
+    }
+
+    def __init__(self, stats: Stats = None):
         self.json: Mapping = dict()
         self.data: geobuf_pb2.Data = geobuf_pb2.Data()
         self.precision: int = 6
         self.dim: int = 2
         self.e: int = pow(10, self.precision)
-        self.keys = collections.OrderedDict()
-
-    def encode(self, data_json: Mapping, precision: int = 6, dim: int = 2):
+        self.keys: dict = {}  # key -> index into self.data.keys
+        self.dedupe_values: bool = False
+        self.use_numpy: bool = False
+        self.simplify = None
+        self.stats = stats
+        if stats is not None:
+            stats.instrument(self, self.instrumented)
+
+    def encode(self, data_json: Mapping, precision: int = 6, dim: int = 2, dedupe_values: bool = False,
+               use_numpy: bool = False, simplify: float = None, auto: bool = False):
+        """Encode GeoJSON. With auto, precision is the largest precision to
+        use and the precision and dimensions are those found by analyze()."""
         obj = self.json = data_json
-        data = self.data = geobuf_pb2.Data()
-        data.dimensions = dim
-        data.precision = precision
-
-        self.precision = precision
-        self.dim = dim
-        self.e = pow(10, precision)  # multiplier for converting coordinates into integers
+        if auto:
+            precision, dim = self.analyze(obj, precision, use_numpy)
+        data = self.setup(precision, dim, dedupe_values, use_numpy, simplify)
 
         data_type = obj['type']
 
@@ -47,19 +70,252 @@ class Encoder:
         else:
             self.encode_geometry(data.geometry, obj)
 
-        return data.SerializeToString()
+        encoded = self.serialize(data)
+        if self.stats is not None:
+            self.stats.keys += len(data.keys)
+            self.stats.bytes_written += len(encoded)
+        return encoded
+
+    def encode_many(self, objects, precision: int = 6, dim: int = 2, **options):
+        """Encode each GeoJSON object of an iterable as a separate Data
+        message and return the list of encoded messages. Every message gets
+        its own key table; options are those of encode()."""
+        return [self.encode(obj, precision, dim, **options) for obj in objects]
+
+    def encode_stream(self, features, fp, precision: int = 6, dim: int = 2, custom_properties: Mapping = None,
+                      **options):
+        """Encode an iterable of GeoJSON features as a FeatureCollection
+        written to the binary file object fp, one feature at a time.
+
+        custom_properties are extra FeatureCollection members; options are
+        those of encode().
+        """
+        with FeatureCollectionWriter(fp, precision, dim, encoder=self, **options) as writer:
+            for feature_json in features:
+                writer.write(feature_json)
+            if custom_properties:
+                writer.write_custom_properties(custom_properties)
+
+    def encode_columns(self, columns: Mapping, precision: int = 6, dim: int = None, custom_properties: Mapping = None,
+                       dedupe_values: bool = False):
+        """Encode a FeatureCollection given as columns, the layout returned by
+        Decoder.to_columns, without building GeoJSON objects.
+
+        columns['properties'] maps keys to equal-length arrays, where masked
+        entries (numpy.ma) are absent properties; columns['id'] is an
+        optional array of ids and columns['members'] an optional array of
+        dicts of other feature members; columns['geometry'] holds the 'type'
+        codes, the 'geometry_offsets', 'part_offsets' and 'ring_offsets',
+        the (n, dim) 'coords' with closed rings and optional 'members', as
+        described in to_columns. dim defaults to the number of columns of
+        'coords', and a different dim is refused. custom_properties are
+        extra FeatureCollection members.
+
+        The output decodes to the same GeoJSON as encoding the features
+        does, but the properties of each feature are written in column
+        order, so the bytes only match when each feature lists its
+        properties in that order.
+        """
+        if np is None:
+            raise ImportError("encode_columns requires numpy")
+        geometry_columns = columns['geometry']
+        coords_shape = np.shape(geometry_columns['coords'])
+        coords_dim = coords_shape[1] if len(coords_shape) == 2 else 2
+        if dim is None:
+            dim = coords_dim
+        elif dim != coords_dim and coords_shape[0]:
+            raise ValueError("dim is %d but the coordinates have %d dimensions" % (dim, coords_dim))
+        data = self.setup(precision, dim, dedupe_values, use_numpy=True)
+        if custom_properties:
+            self.encode_custom_properties(data.feature_collection, custom_properties, ('type', 'features'),
+                                          self.value_table())
+        types = np.asarray(geometry_columns['type']).tolist()
+        num_features = len(types)
+
+        properties = []
+        for key, column in columns.get('properties', {}).items():
+            missing = np.ma.getmaskarray(column)
+            if len(missing) != num_features:
+                raise ValueError("Column %r has %d rows, expected %d" % (key, len(missing), num_features))
+            present = np.flatnonzero(~missing)
+            if len(present):
+                properties.append((present[0], key, np.ma.getdata(column).tolist(), missing.tolist()))
+
+        ids = self.object_column(columns.get('id'))
+        members = self.object_column(columns.get('members'))
+        geometry_members = self.object_column(geometry_columns.get('members'))
+
+        # Keys are numbered once, in the order in which rows first use them,
+        # as when encoding GeoJSON: by row, then properties in column order,
+        # then feature members, then geometry members.
+        first_uses = [(first, 0, position, key) for position, (first, key, values, missing) in enumerate(properties)]
+        for phase, column in ((1, members), (2, geometry_members)):
+            seen = set()
+            for row, obj in enumerate(column or ()):
+                for position, key in enumerate(obj or ()):
+                    if key not in seen:
+                        seen.add(key)
+                        first_uses.append((row, phase, position, key))
+        for first, phase, position, key in sorted(first_uses, key=lambda use: use[:3]):
+            self.key_index(key)
+        properties = [(self.keys[key], values, missing) for first, key, values, missing in properties]
+
+        geometry_offsets, part_offsets, ring_offsets, coords = self.encode_geometry_columns(geometry_columns)
+
+        features = data.feature_collection.features
+        for row in range(num_features):
+            feature = features.add()
+            if ids is not None and ids[row] is not None:
+                self.encode_id(feature, ids[row])
+            value_table = self.value_table()
+            for key_index, values, missing in properties:
+                if not missing[row]:
+                    feature.properties.append(key_index)
+                    feature.properties.append(self.add_value(values[row], feature.values, value_table))
+            if members is not None and members[row]:
+                self.encode_custom_properties(feature, members[row], (), value_table)
+
+            geometry = feature.geometry
+            if geometry_members is not None and geometry_members[row]:
+                self.encode_custom_properties(geometry, geometry_members[row], (), self.value_table())
+            geometry.type = types[row]
+            parts = range(geometry_offsets[row], geometry_offsets[row + 1])
+            gt = types[row]
+            if gt == self.geometry_types['MultiLineString'] and len(parts) != 1:
+                geometry.lengths.extend(ring_offsets[part_offsets[p] + 1] - ring_offsets[part_offsets[p]]
+                                        for p in parts)
+            elif gt == self.geometry_types['Polygon']:
+                rings = range(part_offsets[parts[0]], part_offsets[parts[0] + 1])
+                if len(rings) != 1:
+                    geometry.lengths.extend(ring_offsets[r + 1] - ring_offsets[r] for r in rings)
+            elif gt == self.geometry_types['MultiPolygon']:
+                if len(parts) != 1 or part_offsets[parts[0] + 1] - part_offsets[parts[0]] != 1:
+                    geometry.lengths.append(len(parts))
+                    for p in parts:
+                        rings = range(part_offsets[p], part_offsets[p + 1])
+                        geometry.lengths.append(len(rings))
+                        geometry.lengths.extend(ring_offsets[r + 1] - ring_offsets[r] for r in rings)
+            first_point = ring_offsets[part_offsets[geometry_offsets[row]]]
+            last_point = ring_offsets[part_offsets[geometry_offsets[row + 1]]]
+            geometry.coords.extend(coords[first_point * dim:last_point * dim])
+
+        encoded = self.serialize(data)
+        if self.stats is not None:
+            self.stats.keys += len(data.keys)
+            self.stats.bytes_written += len(encoded)
+        return encoded
+
+    @staticmethod
+    def object_column(column):
+        """Return the values of an optional masked column as a list, with
+        None for masked entries."""
+        if column is None:
+            return None
+        missing = np.ma.getmaskarray(column).tolist()
+        return [None if m else value for value, m in zip(np.ma.getdata(column).tolist(), missing)]
+
+    def encode_geometry_columns(self, geometry_columns):
+        """Quantize and delta-encode the coordinates of geometry columns at
+        once. Returns the offsets as lists, with ring offsets counting the
+        points that are stored (closed rings without their last point), and
+        the flat list of stored coordinates."""
+        types = np.asarray(geometry_columns['type'])
+        if (types == self.geometry_types['GeometryCollection']).any():
+            raise ValueError("GeometryCollections cannot be encoded from columns")
+        geometry_offsets = np.asarray(geometry_columns['geometry_offsets'], dtype=np.intp)
+        part_offsets = np.asarray(geometry_columns['part_offsets'], dtype=np.intp)
+        ring_offsets = np.asarray(geometry_columns['ring_offsets'], dtype=np.intp)
+
+        rings_per_geometry = np.diff(part_offsets[geometry_offsets])
+        ring_types = np.repeat(types, rings_per_geometry)
+        closed = np.isin(ring_types, [self.geometry_types['Polygon'], self.geometry_types['MultiPolygon']])
+        lengths = np.diff(ring_offsets)
+        closed &= lengths > 0
+
+        # drop the closing point of polygon rings, as add_line does
+        keep = np.ones(ring_offsets[-1], dtype=np.bool_)
+        keep[ring_offsets[1:][closed] - 1] = False
+        q = self.quantize(np.asarray(geometry_columns['coords'])[:ring_offsets[-1]])[keep]
+        lengths = lengths - closed
+
+        stored_offsets = np.zeros(len(lengths) + 1, dtype=np.intp)
+        np.cumsum(lengths, out=stored_offsets[1:])
+        coords = self.delta_encode(q, lengths).ravel().tolist()
+        return geometry_offsets.tolist(), part_offsets.tolist(), stored_offsets.tolist(), coords
+
+    @staticmethod
+    def analyze(data_json: Mapping, max_precision: int = 6, use_numpy: bool = False):
+        """Return the smallest precision, up to max_precision, that encodes
+        every coordinate of a GeoJSON object exactly, and the largest number
+        of dimensions of its points (at least 2), in one pass over the
+        coordinates. With use_numpy the precision is found with vectorized
+        operations."""
+        if use_numpy and np is None:
+            raise ImportError("use_numpy=True requires numpy")
+        dim = 2
+        values = []
+        for points in iter_point_lists(data_json):
+            if points:
+                dim = max(dim, max(map(len, points)))
+                values.extend(itertools.chain.from_iterable(points))
+
+        precision = 0
+        e = 1
+        if use_numpy:
+            remaining = np.asarray(values, dtype=np.float64)
+            while precision < max_precision:
+                remaining = remaining[np.rint(remaining * e) / e != remaining]
+                if not len(remaining):
+                    break
+                precision += 1
+                e *= 10
+            return precision, dim
+
+        for x in values:
+            while precision < max_precision and round(x * e) / e != x:
+                precision += 1
+                e *= 10
+        return precision, dim
+
+    def setup(self, precision: int = 6, dim: int = 2, dedupe_values: bool = False, use_numpy: bool = False,
+              simplify: float = None):
+        """Start a new Data message with empty key table, and return it."""
+        if use_numpy and np is None:
+            raise ImportError("use_numpy=True requires numpy")
+
+        data = self.data = geobuf_pb2.Data()
+        self.keys = {}
+        data.dimensions = dim
+        data.precision = precision
+
+        self.precision = precision
+        self.dim = dim
+        self.e = pow(10, precision)  # multiplier for converting coordinates into integers
+        self.dedupe_values = dedupe_values  # store repeated values once per message
+        self.use_numpy = use_numpy  # quantize and delta-encode whole rings with numpy
+        self.simplify = simplify  # tolerance of line simplification in coordinate units, or None
+        return data
+
+    def serialize(self, message):
+        """Return the encoded bytes of a message."""
+        return message.SerializeToString()
 
     def encode_feature_collection(self, feature_collection, feature_collection_json):
-        self.encode_custom_properties(feature_collection, feature_collection_json, ('type', 'features'))
+        self.encode_custom_properties(feature_collection, feature_collection_json, ('type', 'features'),
+                                      self.value_table())
         for feature_json in feature_collection_json.get('features'):
             self.encode_feature(feature_collection.features.add(), feature_json)
 
     def encode_feature(self, feature, feature_json):
+        value_table = self.value_table()
         self.encode_id(feature, feature_json.get('id'))
-        self.encode_properties(feature, feature_json.get('properties'))
-        self.encode_custom_properties(feature, feature_json, ('type', 'id', 'properties', 'geometry'))
+        self.encode_properties(feature, feature_json.get('properties'), value_table)
+        self.encode_custom_properties(feature, feature_json, ('type', 'id', 'properties', 'geometry'), value_table)
         self.encode_geometry(feature.geometry, feature_json.get('geometry'))
 
+    # nesting depth of the lines of the geometry types that simplify_coords applies to
+    simplified_depths = {'LineString': 0, 'MultiLineString': 1, 'Polygon': 1, 'MultiPolygon': 2}
+
     def encode_geometry(self, geometry, geometry_json):
 
         gt = geometry_json['type']
@@ -68,7 +324,11 @@ class Encoder:
         geometry.type = self.geometry_types[gt]
 
         self.encode_custom_properties(geometry, geometry_json,
-                                      ('type', 'id', 'coordinates', 'arcs', 'geometries', 'properties'))
+                                      ('type', 'id', 'coordinates', 'arcs', 'geometries', 'properties'),
+                                      self.value_table())
+
+        if self.simplify is not None and gt in self.simplified_depths:
+            coords = self.simplify_coords(coords, self.simplified_depths[gt], gt in ('Polygon', 'MultiPolygon'))
 
         if gt == 'GeometryCollection':
             for geom in geometry_json.get('geometries'):
@@ -86,54 +346,134 @@ class Encoder:
         elif gt == 'MultiPolygon':
             self.add_multi_polygon(geometry, coords)
 
-    def encode_properties(self, obj, props_json):
+        if self.stats is not None:
+            self.stats.count_coords(gt, len(geometry.coords) // self.dim)
+
+    def simplify_coords(self, coords, depth, is_closed):
+        """Simplify the lines nested depth levels deep in coords."""
+        if depth:
+            return [self.simplify_coords(c, depth - 1, is_closed) for c in coords]
+        return self.simplify_line(coords, is_closed)
+
+    def simplify_line(self, points, is_closed=False):
+        """Return the points of a line or ring that are kept by simplifying
+        it on the integer grid.
+
+        Consecutive points that round to the same integer coordinates in
+        all dim dimensions are dropped, then the Douglas-Peucker algorithm
+        removes the points that are within the simplify tolerance of the
+        simplified line, measured in all dim dimensions too. Rings keep
+        their closing point and at least 4 points; rings that have fewer
+        than 4 distinct points on the grid are left as they are.
+        """
+        e = self.e
+        dim = self.dim
+        if dim == 2:
+            grid = [(round(p[0] * e), round(p[1] * e)) for p in points]
+            farthest = farthest_point
+        else:
+            grid = [tuple(round(p[j] * e) if j < len(p) else 0 for j in range(dim)) for p in points]
+            farthest = farthest_point_nd
+        indexes = [i for i in range(len(grid)) if i == 0 or grid[i] != grid[i - 1]]
+        if is_closed and len(indexes) < 4:
+            return points
+        if len(indexes) == 1 and len(points) > 1:
+            indexes.append(len(points) - 1)  # a line keeps both ends
+        if len(indexes) <= 2:
+            return [points[i] for i in indexes]
+
+        grid = [grid[i] for i in indexes]
+        last = len(grid) - 1
+        sq_tolerance = (self.simplify * e) ** 2
+        keep = [False] * len(grid)
+        keep[0] = keep[last] = True
+        stack = [(0, last)]
+        while stack:
+            first, end = stack.pop()
+            index, sq_dist = farthest(grid, first, end)
+            if sq_dist > sq_tolerance:
+                keep[index] = True
+                stack.append((first, index))
+                stack.append((index, end))
+
+        if is_closed and sum(keep) < 4:
+            # the two most significant points: the farthest from the start,
+            # then the farthest from either of the segments it makes
+            keep = [False] * len(grid)
+            keep[0] = keep[last] = True
+            index, sq_dist = farthest(grid, 0, last)
+            keep[index] = True
+            second = max(farthest(grid, 0, index), farthest(grid, index, last), key=lambda r: r[1])
+            keep[second[0]] = True
+        return [points[indexes[i]] for i in range(len(grid)) if keep[i]]
+
+    def value_table(self):
+        """Return a fresh (value_type, value) -> index table for one message's
+        values, or None when values are not deduplicated."""
+        return {} if self.dedupe_values else None
+
+    def encode_properties(self, obj, props_json, value_table=None):
         if props_json:
             for key, val in props_json.items():
-                self.encode_property(key, val, obj.properties, obj.values)
+                self.encode_property(key, val, obj.properties, obj.values, value_table)
 
-    def encode_custom_properties(self, obj, obj_json, exclude):
+    def encode_custom_properties(self, obj, obj_json, exclude, value_table=None):
         for key, val in obj_json.items():
             if key not in exclude:
-                self.encode_property(key, val, obj.custom_properties, obj.values)
+                self.encode_property(key, val, obj.custom_properties, obj.values, value_table)
 
-    def encode_property(self, key, val, properties, values):
-        keys = self.keys
+    def encode_property(self, key, val, properties, values, value_table=None):
+        properties.append(self.key_index(key))
+        properties.append(self.add_value(val, values, value_table))
 
-        if key not in keys:
-            keys[key] = True
+    def key_index(self, key):
+        """Return the index of key in the key table, adding it if new."""
+        index = self.keys.get(key)
+        if index is None:
+            index = self.keys[key] = len(self.data.keys)
             self.data.keys.append(key)
-            key_index = len(self.data.keys) - 1
-        else:
-            key_index = list(keys.keys()).index(key)
+        return index
+
+    def add_value(self, val, values, value_table=None):
+        """Append val to values and return its index. With a value table,
+        a value already present in values is reused instead."""
+        value_type, v = self.encode_value(val)
+
+        if value_table is not None:
+            index = value_table.get((value_type, v))
+            if index is not None:
+                return index
+            value_table[(value_type, v)] = len(values)
 
         value = values.add()
+        if value_type is not None:
+            setattr(value, value_type, v)
+        return len(values) - 1
 
+    @classmethod
+    def encode_value(cls, val):
+        """Return the (value_type, value) pair that val is stored as."""
         if isinstance(val, dict) or isinstance(val, list):
-            value.json_value = json.dumps(val, separators=(',', ':')).encode('utf-8')
+            return 'json_value', json.dumps(val, separators=(',', ':')).encode('utf-8')
         elif isinstance(val, six.text_type):
-            value.string_value = val
+            return 'string_value', val
         elif isinstance(val, float):
             if val.is_integer():
-                self.encode_int(int(val), value)
-            else:
-                value.double_value = val
+                return cls.encode_int(int(val))
+            return 'double_value', val
         elif isinstance(val, bool):
-            value.bool_value = val
+            return 'bool_value', val
         elif isinstance(val, six.integer_types):
-            self.encode_int(val, value)
-
-        properties.append(key_index)
-        properties.append(len(values) - 1)
+            return cls.encode_int(val)
+        return None, None
 
     @staticmethod
-    def encode_int(val, value):
-        try:
-            if val >= 0:
-                value.pos_int_value = val
-            else:
-                value.neg_int_value = -val
-        except ValueError:
-            value.double_value = val
+    def encode_int(val):
+        if 0 <= val < 1 << 64:
+            return 'pos_int_value', val
+        elif -(1 << 64) < val < 0:
+            return 'neg_int_value', -val
+        return 'double_value', float(val)
 
     @staticmethod
     def encode_id(obj, id):
@@ -151,11 +491,18 @@ class Encoder:
             self.add_coord(coords, x)
 
     def add_line(self, coords, points, is_closed=False):
+        if self.use_numpy:
+            self.add_lines_numpy(coords, [points], is_closed)
+            return
+
         sum = [0] * self.dim
         r = range(0, len(points) - int(is_closed))
         for i in r:
+            point = points[i]
+            if len(point) < self.dim:  # a 2D position in 3D data
+                point = list(point) + [0] * (self.dim - len(point))
             for j in range(0, self.dim):
-                n = int(round(points[i][j] * self.e) - sum[j])
+                n = int(round(point[j] * self.e) - sum[j])
                 coords.append(n)
                 sum[j] += n
 
@@ -164,6 +511,10 @@ class Encoder:
             for points in lines:
                 geometry.lengths.append(len(points) - int(is_closed))
 
+        if self.use_numpy:
+            self.add_lines_numpy(geometry.coords, lines, is_closed)
+            return
+
         for points in lines:
             self.add_line(geometry.coords, points, is_closed)
 
@@ -175,6 +526,247 @@ class Encoder:
                 for points in rings:
                     geometry.lengths.append(len(points) - 1)
 
+        if self.use_numpy:
+            self.add_lines_numpy(geometry.coords, [points for rings in polygons for points in rings], is_closed=True)
+            return
+
         for rings in polygons:
             for points in rings:
                 self.add_line(geometry.coords, points, is_closed=True)
+
+    def quantize(self, points):
+        """Return points as an (n, dim) int64 array of rounded integer
+        coordinates. Positions with fewer than dim values are padded with
+        zeros, as in add_line."""
+        try:
+            arr = np.asarray(points, dtype=np.float64)
+        except ValueError:  # points of mixed dimensions
+            arr = np.zeros((len(points), self.dim))
+            for i, point in enumerate(points):
+                point = point[:self.dim]
+                arr[i, :len(point)] = point
+        if arr.ndim != 2:
+            raise IndexError("points are not a list of positions")
+        if arr.shape[1] < self.dim:
+            arr = np.pad(arr, ((0, 0), (0, self.dim - arr.shape[1])))
+        # np.rint rounds half to even, like round()
+        q = np.rint(arr[:, :self.dim] * self.e)
+        # sint64 fields refuse larger values, which astype would wrap
+        if not ((q >= -2.0 ** 63) & (q < 2.0 ** 63)).all():
+            raise ValueError("Value out of range")
+        return q.astype(np.int64)
+
+    def add_lines_numpy(self, coords, lines, is_closed=False):
+        """Vectorized add_line over several lines at once.
+
+        Deltas are taken between rounded coordinates, so rounding error never
+        accumulates along a line, exactly as in add_line.
+        """
+        arrays = []
+        for points in lines:
+            n = len(points) - int(is_closed)
+            if n > 0:
+                arrays.append(self.quantize(points[:n]))
+        if not arrays:
+            return
+
+        deltas = self.delta_encode(np.concatenate(arrays), np.array([len(a) for a in arrays]))
+        coords.extend(deltas.ravel().tolist())
+
+    @staticmethod
+    def delta_encode(q, lengths):
+        """Return the deltas between consecutive points of the lines of the
+        given lengths stored one after another in the integer array q."""
+        deltas = np.diff(q, axis=0, prepend=0)
+        # the first point of every line is stored relative to the origin
+        starts = (np.cumsum(lengths) - lengths)[lengths > 0]
+        # a difference overflows when its sign differs from that of both
+        # points, except across the start of a line
+        overflow = ((q[1:] ^ q[:-1]) & (q[1:] ^ deltas[1:])) < 0
+        overflow[starts[starts > 0] - 1] = False
+        if overflow.any():
+            raise ValueError("Value out of range")
+        deltas[starts] = q[starts]
+        return deltas
+
+
+def iter_point_lists(obj):
+    """Yield the lists of positions of a GeoJSON object: a list per line or
+    ring, one per MultiPoint and a single-item list per Point."""
+    gt = obj.get('type')
+    if gt == 'FeatureCollection':
+        for feature in obj.get('features'):
+            yield from iter_point_lists(feature)
+    elif gt == 'Feature':
+        if obj.get('geometry'):
+            yield from iter_point_lists(obj['geometry'])
+    elif gt == 'GeometryCollection':
+        for geometry in obj.get('geometries'):
+            yield from iter_point_lists(geometry)
+    elif gt == 'Point':
+        yield [obj['coordinates']]
+    elif gt in ('MultiPoint', 'LineString'):
+        yield obj['coordinates']
+    elif gt in ('MultiLineString', 'Polygon'):
+        yield from obj['coordinates']
+    elif gt == 'MultiPolygon':
+        for rings in obj['coordinates']:
+            yield from rings
+
+
+def farthest_point(points, first, last):
+    """Return the index of the point between points[first] and points[last]
+    farthest from the segment joining them, and its squared distance, or
+    (None, -1) when there are no points between them."""
+    ax, ay = points[first]
+    bx, by = points[last]
+    dx = bx - ax
+    dy = by - ay
+    length = dx * dx + dy * dy
+    index = None
+    max_sq_dist = -1
+    for i in range(first + 1, last):
+        px, py = points[i]
+        if length:
+            t = ((px - ax) * dx + (py - ay) * dy) / length
+            t = 0 if t < 0 else 1 if t > 1 else t
+            x = ax + t * dx - px
+            y = ay + t * dy - py
+        else:
+            x = ax - px
+            y = ay - py
+        sq_dist = x * x + y * y
+        if sq_dist > max_sq_dist:
+            index = i
+            max_sq_dist = sq_dist
+    return index, max_sq_dist
+
+
+def farthest_point_nd(points, first, last):
+    """farthest_point for points of any number of dimensions."""
+    a = points[first]
+    d = [b - a for a, b in zip(a, points[last])]
+    length = sum(c * c for c in d)
+    index = None
+    max_sq_dist = -1
+    for i in range(first + 1, last):
+        p = points[i]
+        t = 0
+        if length:
+            t = sum((pc - ac) * dc for pc, ac, dc in zip(p, a, d)) / length
+            t = 0 if t < 0 else 1 if t > 1 else t
+        sq_dist = sum((ac + t * dc - pc) ** 2 for pc, ac, dc in zip(p, a, d))
+        if sq_dist > max_sq_dist:
+            index = i
+            max_sq_dist = sq_dist
+    return index, max_sq_dist
+
+
+class FeatureCollectionWriter:
+    """Write a FeatureCollection to a binary file object incrementally.
+
+    Each feature is written as its own `feature_collection` field holding a
+    single feature, and the global keys follow the last feature. Protobuf
+    merges repeated occurrences of a message field, so the output parses as
+    one Data message with protobuf, while neither the GeoJSON nor the Data
+    message has to be held in memory. Readers that do not merge fields, as
+    other geobuf implementations may, keep only the last collection.
+
+    With spool, the encoded features are written to a temporary file
+    instead, and on close the keys, the header and a single
+    `feature_collection` field holding them are written to fp, the layout
+    of Encoder.encode.
+
+        with FeatureCollectionWriter(fp) as writer:
+            for feature in features:
+                writer.write(feature)
+    """
+
+    spool_block_size = 1 << 20  # bytes copied from the spool at a time
+
+    def __init__(self, fp, precision: int = 6, dim: int = 2, encoder: Encoder = None, spool: bool = False,
+                 **options):
+        self.fp = fp
+        self.encoder = encoder or Encoder()
+        self.bytes_written = 0
+        self.num_chunks = 0
+
+        self.header = self.encoder.setup(precision, dim, **options)
+        self.spool = tempfile.TemporaryFile() if spool else None
+        if self.spool is None:
+            self._write(self.encoder.serialize(self.header))
+
+    def write(self, feature_json: Mapping):
+        feature = geobuf_pb2.Data.Feature()
+        self.encoder.encode_feature(feature, feature_json)
+        self.write_chunk(wire.encode_length_delimited(
+            geobuf_pb2.Data.FeatureCollection.FEATURES_FIELD_NUMBER, self.encoder.serialize(feature)))
+
+    def write_custom_properties(self, obj_json: Mapping, exclude=('type', 'features')):
+        """Write the FeatureCollection's own members other than exclude."""
+        feature_collection = geobuf_pb2.Data.FeatureCollection()
+        self.encoder.encode_custom_properties(feature_collection, obj_json, exclude, self.encoder.value_table())
+        if feature_collection.custom_properties:
+            self.write_chunk(self.encoder.serialize(feature_collection))
+
+    def write_chunk(self, feature_collection_bytes: bytes):
+        """Write a serialized FeatureCollection to be merged into the output."""
+        if self.spool is not None:
+            self.spool.write(feature_collection_bytes)
+        else:
+            self._write(wire.encode_length_delimited(geobuf_pb2.Data.FEATURE_COLLECTION_FIELD_NUMBER,
+                                                     feature_collection_bytes))
+        self.num_chunks += 1
+
+    def close(self):
+        if self.encoder.stats is not None:
+            self.encoder.stats.keys += len(self.encoder.data.keys)
+        if self.spool is not None:
+            self.close_spool()
+            return
+        if not self.num_chunks:
+            self.write_chunk(b'')  # still mark the data as a FeatureCollection
+        trailer = geobuf_pb2.Data()
+        trailer.keys.extend(self.encoder.data.keys)
+        self._write(self.encoder.serialize(trailer))
+
+    def close_spool(self):
+        """Write the keys and header, then the spooled features as one
+        FeatureCollection."""
+        spool, self.spool = self.spool, None
+        with spool:
+            size = spool.tell()
+            self._write(self.encoder.serialize(self.header))  # the keys are set on the header
+            self._write(wire.encode_tag(geobuf_pb2.Data.FEATURE_COLLECTION_FIELD_NUMBER, wire.LENGTH_DELIMITED) +
+                        wire.encode_varint(size))
+            spool.seek(0)
+            for chunk in iter(lambda: spool.read(self.spool_block_size), b''):
+                self._write(chunk)
+
+    def _write(self, chunk: bytes):
+        self.fp.write(chunk)
+        self.bytes_written += len(chunk)
+        if self.encoder.stats is not None:
+            self.encoder.stats.bytes_written += len(chunk)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+def remap_keys(message, mapping):
+    """Rewrite the key indexes of an encoded Feature or Geometry message in
+    place, replacing each key index i with mapping[i]."""
+    pairs = [message.custom_properties]
+    if isinstance(message, geobuf_pb2.Data.Feature):
+        pairs.append(message.properties)
+        remap_keys(message.geometry, mapping)
+    else:
+        for geometry in message.geometries:
+            remap_keys(geometry, mapping)
+    for properties in pairs:
+        for i in range(0, len(properties), 2):
+            properties[i] = mapping[properties[i]]
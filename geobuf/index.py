@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Random access to the features of an encoded FeatureCollection.
+
+A FeatureIndex records where every Feature message starts and ends in a
+geobuf file, along with its bounding box, and can be saved next to the file
+as a compact sidecar:
+
+    index = FeatureIndex.build(pbf)
+    index.save('example.pbf.idx')
+
+An IndexedReader then decodes single features, slices of features or the
+features within a bounding box by seeking into the (memory mapped) file:
+
+    with IndexedReader('example.pbf') as reader:
+        feature = reader[1234]
+        features = reader.query([-10, 40, 5, 52])
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from . import geobuf_pb2, wire
+from .decode import Decoder
+from .rtree import PackedRTree
+
+INDEX_SUFFIX = '.idx'
+
+# magic, version, dimensions, precision, feature count, size and digest of the indexed file
+_HEADER = struct.Struct('<4sBBBxQQ16s')
+_MAGIC = b'GBIX'
+_VERSION = 2
+
+# bounding box stored for features without coordinates
+_EMPTY_BBOX = (2 ** 63 - 1, 2 ** 63 - 1, -2 ** 63, -2 ** 63)
+
+
+class FeatureIndex:
+    """Byte offsets, lengths and integer bounding boxes of the features of
+    an encoded FeatureCollection, kept in flat arrays."""
+
+    def __init__(self, precision: int = 6, dim: int = 2, source_size: int = 0, source_digest: bytes = b''):
+        self.precision = precision
+        self.dim = dim
+        self.e = pow(10, precision)
+        self.source_size = source_size
+        self.source_digest = source_digest
+        self.offsets = array('Q')
+        self.lengths = array('Q')
+        self.bboxes = array('q')  # min x, min y, max x, max y per feature, in integer units
+        self._rtree = None
+
+    @classmethod
+    def build(cls, buffer):
+        """Index the features of buffer (bytes, memoryview or mmap)."""
+        decoder = Decoder()
+        with memoryview(buffer) as buf:
+            data = decoder.read_header(buf)
+            index = cls(data.precision, data.dimensions, len(buf), digest(buf))
+            for start, end in decoder.feature_spans(buf):
+                geometry = geobuf_pb2.Data.Geometry()
+                for field_number, wire_type, value in wire.iter_fields(buf, start, end):
+                    if field_number == geobuf_pb2.Data.Feature.GEOMETRY_FIELD_NUMBER:
+                        geometry.MergeFromString(buf[value[0]:value[1]])
+                index.offsets.append(start)
+                index.lengths.append(end - start)
+                index.bboxes.extend(decoder.integer_bbox(geometry) or _EMPTY_BBOX)
+        return index
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def bbox(self, i):
+        """Return the [min x, min y, max x, max y] of feature i in coordinate
+        units, or None when it has no coordinates."""
+        box = self.bboxes[4 * i:4 * i + 4]
+        if box[0] > box[2]:
+            return None
+        return [x / self.e for x in box]
+
+    @property
+    def rtree(self):
+        """Packed Hilbert R-tree of the feature bounding boxes, built on first use."""
+        if self._rtree is None:
+            self._rtree = PackedRTree(self.bboxes)
+        return self._rtree
+
+    def query(self, bbox):
+        """Return the sorted positions of the features whose bounding boxes
+        intersect bbox, given as [min x, min y, max x, max y]."""
+        min_x, min_y, max_x, max_y = bbox
+        return self.rtree.search(math.floor(min_x * self.e), math.floor(min_y * self.e),
+                                 math.ceil(max_x * self.e), math.ceil(max_y * self.e))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.dim, self.precision, len(self), self.source_size,
+                                 self.source_digest))
+            for arr in (self.offsets, self.lengths, self.bboxes):
+                if sys.byteorder == 'big':
+                    arr = array(arr.typecode, arr)
+                    arr.byteswap()
+                arr.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError("%s is not a geobuf index" % path)
+            magic, version, dim, precision, count, source_size, source_digest = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("%s is not a geobuf index" % path)
+            index = cls(precision, dim, source_size, source_digest)
+            for arr, n in ((index.offsets, count), (index.lengths, count), (index.bboxes, 4 * count)):
+                arr.fromfile(f, n)
+                if sys.byteorder == 'big':
+                    arr.byteswap()
+        return index
+
+    def matches(self, buf):
+        """Whether this is the index of the data in buf."""
+        return self.source_size == len(buf) and self.source_digest == digest(buf)
+
+
+def digest(buf):
+    """Return the digest of indexed data that tells whether an index is
+    up to date."""
+    return hashlib.blake2b(buf, digest_size=16).digest()
+
+
+class IndexedReader:
+    """Decode features of an encoded FeatureCollection by position.
+
+    source is a path, which is memory mapped, or a bytes-like buffer. Without
+    an explicit index, the sidecar next to a path (path + '.idx') is loaded
+    if it is up to date, and otherwise the index is built in memory, and
+    written to the sidecar too if save_index is set. An index is up to date
+    when it records the size and the BLAKE2b digest of the data.
+    """
+
+    def __init__(self, source, index: FeatureIndex = None, save_index: bool = False, **options):
+        self._file = self._mmap = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer = self._mmap
+        else:
+            buffer = source
+        self.buf = memoryview(buffer)
+
+        if index is None and self._file is not None:
+            index = self._sidecar(source, save_index)
+        elif index is not None and not index.matches(self.buf):
+            raise ValueError("The index does not match the geobuf data")
+        self.index = index if index is not None else FeatureIndex.build(self.buf)
+
+        self.decoder = Decoder()
+        self.decoder.configure(**options)
+        self.decoder.read_header(self.buf)
+
+    def _sidecar(self, path, save_index):
+        path = os.fspath(path) + INDEX_SUFFIX
+        if os.path.exists(path):
+            try:
+                index = FeatureIndex.load(path)
+            except ValueError:
+                index = None  # written by another version
+            if index is not None and index.matches(self.buf):
+                return index
+        index = FeatureIndex.build(self.buf)
+        if save_index:
+            index.save(path)
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.feature(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("feature index out of range")
+        return self.feature(i)
+
+    def feature(self, i):
+        start = self.index.offsets[i]
+        feature = geobuf_pb2.Data.Feature.FromString(self.buf[start:start + self.index.lengths[i]])
+        return self.decoder.decode_feature(feature)
+
+    def query(self, bbox):
+        """Decode only the features whose bounding boxes intersect bbox,
+        given as [min x, min y, max x, max y]."""
+        return [self.feature(i) for i in self.index.query(bbox)]
+
+    def close(self):
+        self.buf.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Stream GeoJSON text out of geobuf data.
+
+GeoJSONWriter writes the GeoJSON text of an encoded Data message to a text
+file object while walking its features, one Feature message at a time.
+Coordinates are formatted straight from the integer deltas at the stored
+precision, without building Python lists or dicts for them.
+
+    with open('example.pbf', 'rb') as f:
+        GeoJSONWriter().write(f.read(), sys.stdout)
+"""
+
+import itertools
+import json
+
+from . import geobuf_pb2
+from .decode import Decoder
+from .stats import Stats
+
+
+class GeoJSONWriter(Decoder):
+    """Write decoded GeoJSON as text; the output parses to what
+    Decoder.decode returns, with the same member order."""
+
+    instrumented = {
+        'write_feature': 'features',
+        'write_properties': 'properties',
+        'decode_value': 'values',
+        'write_geometry': 'geometry',
+    }
+
+    def __init__(self, stats: Stats = None):
+        super().__init__(stats)
+        self.precision: int = 0
+
+    def write(self, buffer, fp):
+        """Write the GeoJSON for buffer (bytes, memoryview or mmap) to fp."""
+        self.configure()
+        with memoryview(buffer) as buf:
+            data = self.read_header(buf)
+            self.precision = data.precision
+            data_type = data.WhichOneof('data_type')
+            if data_type == 'feature_collection':
+                fp.write('{"type": "FeatureCollection", "features": [')
+                for i, (start, end) in enumerate(self.feature_spans(buf)):
+                    if i:
+                        fp.write(', ')
+                    self.write_feature(geobuf_pb2.Data.Feature.FromString(buf[start:end]), fp)
+                fp.write(']')
+                for key, value in self.read_custom_properties(buf).items():
+                    fp.write(', %s: %s' % (json.dumps(key), json.dumps(value)))
+                fp.write('}')
+            elif data_type == 'feature':
+                for start, end in self.feature_spans(buf):
+                    self.write_feature(geobuf_pb2.Data.Feature.FromString(buf[start:end]), fp)
+            elif data_type == 'geometry':
+                data = geobuf_pb2.Data.FromString(buf)
+                self.write_geometry(data.geometry, fp)
+            else:
+                fp.write('null')
+
+    def write_feature(self, feature, fp):
+        fp.write('{"type": "Feature"')
+        self.write_properties(feature.custom_properties, feature.values, fp)
+        id_type = feature.WhichOneof('id_type')
+        if id_type is not None:
+            fp.write(', "id": %s' % json.dumps(getattr(feature, id_type)))
+        fp.write(', "geometry": ')
+        self.write_geometry(feature.geometry, fp)
+        if len(feature.properties):
+            fp.write(', "properties": {')
+            self.write_properties(feature.properties, feature.values, fp, separator='')
+            fp.write('}')
+        fp.write('}')
+
+    def write_properties(self, props, values, fp, separator=', '):
+        """Write the members for key/value index pairs. The first member is
+        preceded by separator and the others by a comma."""
+        for i in range(0, len(props), 2):
+            value = self.decode_value(values[props[i + 1]])
+            if value is not None:
+                fp.write('%s%s: %s' % (separator, json.dumps(self.data.keys[props[i]]), json.dumps(value)))
+                separator = ', '
+
+    def write_geometry(self, geometry, fp):
+        gt = self.geometry_types[geometry.type]
+        fp.write('{"type": "%s"' % gt)
+        self.write_properties(geometry.custom_properties, geometry.values, fp)
+
+        if gt == 'GeometryCollection':
+            fp.write(', "geometries": [')
+            for i, geom in enumerate(geometry.geometries):
+                if i:
+                    fp.write(', ')
+                self.write_geometry(geom, fp)
+            fp.write(']}')
+            return
+
+        fp.write(', "coordinates": ')
+        coords = geometry.coords
+        if self.stats is not None:
+            self.stats.count_coords(gt, len(coords) // self.dim)
+        lengths = self.line_lengths(geometry)
+        if gt == 'Point':
+            fp.write('[%s]' % ', '.join(map(self.format_coord, coords)))
+        elif gt in ('MultiPoint', 'LineString'):
+            self.write_line(coords, 0, lengths[0], fp)
+        elif gt in ('MultiLineString', 'Polygon'):
+            self.write_lines(coords, 0, lengths, gt == 'Polygon', fp)
+        elif gt == 'MultiPolygon':
+            num_rings = [1]
+            if len(geometry.lengths):
+                num_rings = []
+                j = 1
+                for n in range(geometry.lengths[0]):
+                    num_rings.append(geometry.lengths[j])
+                    j += 1 + geometry.lengths[j]
+            fp.write('[')
+            start = 0
+            for i, n in enumerate(num_rings):
+                if i:
+                    fp.write(', ')
+                start = self.write_lines(coords, start, lengths[:n], True, fp)
+                lengths = lengths[n:]
+            fp.write(']')
+        fp.write('}')
+
+    def write_lines(self, coords, start, lengths, is_closed, fp):
+        """Write a list of lines starting at coords[start]; return the index
+        after the last one."""
+        fp.write('[')
+        for i, length in enumerate(lengths):
+            if i:
+                fp.write(', ')
+            start = self.write_line(coords, start, length, fp, is_closed)
+        fp.write(']')
+        return start
+
+    def write_line(self, coords, start, length, fp, is_closed=False):
+        """Write the length points of the line starting at coords[start];
+        return the index after the last one."""
+        dim = self.dim
+        end = start + length * dim
+        columns = [map(self.format_coord, itertools.accumulate(coords[start + j:end:dim])) for j in range(dim)]
+        points = ['[%s]' % ', '.join(point) for point in zip(*columns)]
+        if is_closed:
+            points.append(points[0])
+        fp.write('[%s]' % ', '.join(points))
+        return end
+
+    def format_coord(self, n):
+        """Format an integer coordinate as a decimal number at the stored precision."""
+        precision = self.precision
+        if not precision:
+            return '%d.0' % n
+        whole, fraction = divmod(abs(n), self.e)
+        fraction = ('%0*d' % (precision, fraction)).rstrip('0') or '0'
+        return '%s%d.%s' % ('-' if n < 0 else '', whole, fraction)
+
+
+class GeoJSONReader:
+    """Read GeoJSON text from a file object incrementally.
+
+    The input may be a single GeoJSON object, or a sequence of them, either
+    newline-delimited or RFC 8142 GeoJSON text sequences. The features of a
+    FeatureCollection or of a sequence are parsed one at a time as they are
+    iterated, so memory use stays flat however long the input is. A single
+    object without an RFC 8142 record separator is taken as a sequence of one
+    only if sequence is set.
+
+        reader = GeoJSONReader(sys.stdin)
+        if reader.type in ('FeatureCollection', 'FeatureSequence'):
+            for feature in reader.features():
+                ...
+            members = reader.members  # the collection's other members
+        else:
+            obj = reader.value
+    """
+
+    whitespace = ' \t\n\r\x1e'  # RFC 8142 record separators count as whitespace
+
+    def __init__(self, fp, chunk_size: int = 1 << 16, sequence: bool = False):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+        self.record_separators = False  # whether any RS characters were skipped
+        self.decoder = json.JSONDecoder()
+
+        self.type = None
+        self.value = None
+        self.members = {}
+        self._first = None
+
+        if self._peek() != '{':
+            raise ValueError("Expected a GeoJSON object at offset 0")
+        self.pos += 1
+        if self._read_members():
+            self.type = 'FeatureCollection'
+        elif sequence or self._peek() is not None or self.record_separators:  # RFC 8142 texts start with one
+            self.type = 'FeatureSequence'
+            self._first = self.members
+            self.members = {}
+        else:
+            self.type = self.members.get('type')
+            self.value = self.members
+            self.members = {}
+
+    def features(self):
+        """Yield the features of a FeatureCollection or sequence in order."""
+        if self.type == 'FeatureCollection':
+            if self._peek() == ']':
+                self.pos += 1
+            else:
+                while True:
+                    yield self._read_value()
+                    c = self._peek()
+                    if c is None:
+                        raise ValueError("Unterminated features array")
+                    elif c not in ',]':
+                        raise ValueError("Expected ',' or ']' at offset %d" % self.pos)
+                    self.pos += 1
+                    if c == ']':
+                        break
+            self._read_members(first=False)
+            if self._peek() is not None:
+                raise ValueError("Unexpected data after the FeatureCollection at offset %d" % self.pos)
+        elif self.type == 'FeatureSequence':
+            first, self._first = self._first, None
+            yield first
+            while self._peek() is not None:
+                yield self._read_value()
+
+    def _read_members(self, first=True):
+        """Read object members into self.members until the closing brace or
+        the opening bracket of a features array; return whether the latter
+        was reached. first tells whether no member precedes them."""
+        while True:
+            c = self._peek()
+            if c is None:
+                raise ValueError("Unterminated object")
+            elif c == '}':
+                self.pos += 1
+                return False
+            elif not first:
+                if c != ',':
+                    raise ValueError("Expected ',' or '}' at offset %d" % self.pos)
+                self.pos += 1
+                c = self._peek()
+            if c != '"':
+                raise ValueError("Expected a member name at offset %d" % self.pos)
+            key = self._read_value()
+            if self._peek() != ':':
+                raise ValueError("Expected ':' at offset %d" % self.pos)
+            self.pos += 1
+            first = False
+            if key == 'features' and self._peek() == '[':
+                self.pos += 1
+                return True
+            self.members[key] = self._read_value()
+
+    def _peek(self):
+        """Skip whitespace and return the next character, or None at the end."""
+        while True:
+            start = self.pos
+            while self.pos < len(self.text) and self.text[self.pos] in self.whitespace:
+                self.pos += 1
+            if '\x1e' in self.text[start:self.pos]:
+                self.record_separators = True
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self._fill():
+                return None
+
+    def _read_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _fill(self):
+        """Append the next chunk of input to the buffer, dropping what has
+        been consumed; return False at the end of the input."""
+        if self.eof:
+            return False
+        chunk = self.fp.read(max(self.chunk_size, len(self.text) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
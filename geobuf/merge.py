@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Merge encoded FeatureCollections without decoding their features.
+
+The key tables of the inputs are joined into one, and only the key indexes
+in the properties and custom properties of each feature are rewritten.
+Everything else, including the packed coordinates and lengths, is copied
+as it is, unless the inputs were encoded with different precisions and the
+coordinates have to be rescaled.
+
+    with open('merged.pbf', 'wb') as fp:
+        geobuf.merge.merge([north_pbf, south_pbf], fp)
+"""
+
+import io
+
+from . import geobuf_pb2, wire
+from .decode import Decoder
+from .encode import FeatureCollectionWriter
+from .wiredecode import WireDecoder
+
+Feature = geobuf_pb2.Data.Feature
+Geometry = geobuf_pb2.Data.Geometry
+
+
+def merge(buffers, fp=None, rescale: bool = True, stream: bool = False):
+    """Write the features of the encoded FeatureCollections or Features in
+    buffers (bytes, memoryviews or mmaps) to fp as one FeatureCollection,
+    or return it as bytes if fp is None.
+
+    The features are spooled to a temporary file so that the keys and a
+    single FeatureCollection follow the header, as in Encoder.encode. With
+    stream, they are written to fp directly in the layout of
+    FeatureCollectionWriter, with the keys at the end.
+
+    Inputs encoded with a lower precision than the others are scaled up to
+    the highest one, which is lossless, or a ValueError is raised if
+    rescale is False. Inputs with different dimensions are always refused.
+    Members of the collections themselves are merged, the later inputs
+    overriding the earlier ones.
+    """
+    if fp is None:
+        fp = io.BytesIO()
+        merge(buffers, fp, rescale, stream)
+        return fp.getvalue()
+
+    views = [memoryview(buffer) for buffer in buffers]
+    try:
+        decoders = [Decoder() for buf in views]
+        headers = [read_header(decoder, buf) for decoder, buf in zip(decoders, views)]
+        precision = max((data.precision for data in headers), default=6)
+        dimensions = {data.dimensions for data in headers}
+        if len(dimensions) > 1:
+            raise ValueError("Cannot merge data of %s dimensions" % ' and '.join(map(str, sorted(dimensions))))
+        if not rescale and any(data.precision != precision for data in headers):
+            raise ValueError("Cannot merge data of different precisions without rescaling")
+
+        writer = FeatureCollectionWriter(fp, precision, dimensions.pop() if dimensions else 2, spool=not stream)
+        members = {}
+        for buf, decoder, data in zip(views, decoders, headers):
+            mapping = [writer.encoder.key_index(key) for key in data.keys]
+            scale = pow(10, precision - data.precision)
+            for start, end in Decoder.feature_spans(buf):
+                if scale == 1 and mapping == list(range(len(mapping))):
+                    feature_bytes = buf[start:end]
+                else:
+                    feature_bytes = rewrite(buf, start, end, Feature, mapping, scale)
+                writer.write_chunk(wire.encode_length_delimited(
+                    geobuf_pb2.Data.FeatureCollection.FEATURES_FIELD_NUMBER, feature_bytes))
+            if data.WhichOneof('data_type') == 'feature_collection':
+                members.update(decoder.read_custom_properties(buf))
+        writer.write_custom_properties(members, exclude=())
+        writer.close()
+    finally:
+        for buf in views:
+            buf.release()
+
+
+def read_header(decoder, buf):
+    data = decoder.read_header(buf)
+    if data.WhichOneof('data_type') not in ('feature_collection', 'feature'):
+        raise ValueError("Only FeatureCollections and Features can be merged")
+    return data
+
+
+def rewrite(buf, start, end, message_type, mapping, scale):
+    """Return the Feature or Geometry message in buf[start:end] with each
+    key index i replaced by mapping[i] and its coordinates multiplied by
+    scale."""
+    out = []
+    key_value_fields = {message_type.CUSTOM_PROPERTIES_FIELD_NUMBER: []}
+    if message_type is Feature:
+        key_value_fields[Feature.PROPERTIES_FIELD_NUMBER] = []
+
+    for field_number, wire_type, value in wire.iter_fields(buf, start, end):
+        if field_number in key_value_fields:
+            key_value_fields[field_number].extend(WireDecoder.read_packed(buf, wire_type, value))
+        elif message_type is Feature and field_number == Feature.GEOMETRY_FIELD_NUMBER or \
+                message_type is Geometry and field_number == Geometry.GEOMETRIES_FIELD_NUMBER:
+            out.append(wire.encode_length_delimited(field_number, rewrite(buf, *value, Geometry, mapping, scale)))
+        elif message_type is Geometry and field_number == Geometry.COORDS_FIELD_NUMBER and scale != 1:
+            coords = WireDecoder.read_packed(buf, wire_type, value, zigzag=True)
+            out.append(wire.encode_packed(field_number, [c * scale for c in coords], zigzag=True))
+        else:
+            out.append(wire.encode_field(buf, field_number, wire_type, value))
+
+    # Both fields come last in the canonical field order.
+    for field_number, pairs in sorted(key_value_fields.items()):
+        if pairs:
+            pairs[::2] = [mapping[i] for i in pairs[::2]]
+            out.append(wire.encode_packed(field_number, pairs))
+    return b''.join(out)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Encode and decode large FeatureCollections on several cores.
+
+Features are split into chunks which are encoded or decoded in a process
+pool. Each encoded chunk comes back with its own key table; the tables are
+merged in chunk order and the property key indexes of a chunk are rewritten
+only where its keys land at different positions, so the result is
+byte-for-byte what Encoder.encode produces.
+
+    pbf = geobuf.parallel.encode(geojson, jobs=8)
+    geojson = geobuf.parallel.decode(pbf, jobs=8)
+"""
+
+import concurrent.futures
+import os
+
+from typing import Mapping
+
+from . import geobuf_pb2, wire
+from .decode import Decoder
+from .encode import Encoder, remap_keys
+
+
+def encode(data_json: Mapping, precision: int = 6, dim: int = 2, jobs: int = None, chunk_size: int = None,
+           **options):
+    """Encode GeoJSON like Encoder.encode, using jobs processes for the
+    features of a FeatureCollection (all cores by default)."""
+    features = data_json.get('features') if data_json.get('type') == 'FeatureCollection' else None
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or not features or len(features) < 2:
+        return Encoder().encode(data_json, precision, dim, **options)
+    if options.pop('auto', False):
+        precision, dim = Encoder.analyze(data_json, precision, options.get('use_numpy', False))
+
+    encoder = Encoder()
+    data = encoder.setup(precision, dim, **options)
+    feature_collection = geobuf_pb2.Data.FeatureCollection()
+    encoder.encode_custom_properties(feature_collection, data_json, ('type', 'features'), encoder.value_table())
+
+    chunks = _chunks(features, jobs, chunk_size)
+    features_bytes = []
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        results = executor.map(_encode_chunk, chunks, [(precision, dim, options)] * len(chunks))
+        for keys, encoded in results:
+            mapping = [encoder.key_index(key) for key in keys]
+
+            if mapping != list(range(len(mapping))):
+                for i, feature_bytes in enumerate(encoded):
+                    feature = geobuf_pb2.Data.Feature.FromString(feature_bytes)
+                    remap_keys(feature, mapping)
+                    encoded[i] = feature.SerializeToString()
+
+            features_bytes.extend(wire.encode_length_delimited(
+                feature_collection.FEATURES_FIELD_NUMBER, feature_bytes) for feature_bytes in encoded)
+
+    features_bytes.append(feature_collection.SerializeToString())
+    return data.SerializeToString() + wire.encode_length_delimited(
+        data.FEATURE_COLLECTION_FIELD_NUMBER, b''.join(features_bytes))
+
+
+def decode(data_str: bytes, jobs: int = None, chunk_size: int = None, **options):
+    """Decode a geobuf like Decoder.decode, using jobs processes for the
+    features of a FeatureCollection (all cores by default). A callable
+    where option, which may not be picklable, runs in this process, and
+    only the features it keeps are sent to the workers."""
+    jobs = jobs or os.cpu_count() or 1
+    decoder = Decoder()
+    with memoryview(data_str) as buf:
+        data = decoder.read_header(buf)
+        spans = list(decoder.feature_spans(buf))
+        if jobs == 1 or data.WhichOneof('data_type') != 'feature_collection' or len(spans) < 2:
+            return decoder.decode(data_str, **options)
+
+        decoder.configure(**options)
+        if callable(decoder.where):
+            decoder.prepare_filters(data.keys)
+            spans = [(start, end) for start, end in spans
+                     if decoder.feature_matches(geobuf_pb2.Data.Feature.FromString(buf[start:end]))]
+            options = dict(options, where=None)
+        custom_properties = decoder.read_custom_properties(buf)
+        chunks = _chunks([bytes(buf[start:end]) for start, end in spans], jobs, chunk_size)
+        header = (list(data.keys), data.precision, data.dimensions, options)
+
+    obj = {'type': 'FeatureCollection', 'features': []}
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        for features in executor.map(_decode_chunk, chunks, [header] * len(chunks)):
+            obj['features'].extend(features)
+    obj.update(custom_properties)
+    return obj
+
+
+def _chunks(items, jobs, chunk_size=None):
+    """Split items into chunks, by default about four per job."""
+    size = chunk_size or -(-len(items) // (jobs * 4)) or 1
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _encode_chunk(features, settings):
+    precision, dim, options = settings
+    encoder = Encoder()
+    encoder.setup(precision, dim, **options)
+    encoded = []
+    for feature_json in features:
+        feature = geobuf_pb2.Data.Feature()
+        encoder.encode_feature(feature, feature_json)
+        encoded.append(feature.SerializeToString())
+    return list(encoder.data.keys), encoded
+
+
+def _decoder(header):
+    """Return a Decoder set up for the features of data with the given
+    (keys, precision, dimensions, options) header."""
+    keys, precision, dim, options = header
+    decoder = Decoder()
+    decoder.configure(**options)
+    decoder.data.keys.extend(keys)
+    decoder.e = pow(10, precision)
+    decoder.dim = dim
+    decoder.prepare_filters(keys)
+    return decoder
+
+
+def _decode_chunk(features, header):
+    decoder = _decoder(header)
+    decoded = []
+    for feature_bytes in features:
+        feature = geobuf_pb2.Data.Feature.FromString(feature_bytes)
+        if decoder.feature_matches(feature):
+            decoded.append(decoder.decode_feature(feature))
+    return decoded
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+A static, packed Hilbert R-tree of bounding boxes.
+
+Items are sorted along a Hilbert curve through the centers of their boxes
+and packed bottom-up into nodes of node_size children, as in Flatbush. Boxes
+are kept in integer coordinate units, the same units as geobuf's coords.
+"""
+
+import bisect
+from array import array
+
+HILBERT_MAX = (1 << 16) - 1
+
+
+class PackedRTree:
+    """Spatial index over a flat sequence of [min x, min y, max x, max y]
+    integer boxes. Items whose min exceeds their max (no coordinates) are
+    never returned."""
+
+    def __init__(self, bboxes, node_size: int = 16):
+        self.node_size = node_size
+        self.boxes = array('q')
+        self.indices = array('Q')
+        self.level_bounds = []
+
+        items = [i for i in range(len(bboxes) // 4) if bboxes[4 * i] <= bboxes[4 * i + 2]]
+        self.num_items = len(items)
+        if not items:
+            return
+
+        min_x = min(bboxes[4 * i] for i in items)
+        min_y = min(bboxes[4 * i + 1] for i in items)
+        width = max(bboxes[4 * i + 2] for i in items) - min_x or 1
+        height = max(bboxes[4 * i + 3] for i in items) - min_y or 1
+
+        def center_hilbert(i):
+            x = HILBERT_MAX * ((bboxes[4 * i] + bboxes[4 * i + 2]) // 2 - min_x) // width
+            y = HILBERT_MAX * ((bboxes[4 * i + 1] + bboxes[4 * i + 3]) // 2 - min_y) // height
+            return hilbert(x, y)
+
+        items.sort(key=center_hilbert)
+        for i in items:
+            self.boxes.extend(bboxes[4 * i:4 * i + 4])
+            self.indices.append(i)
+
+        # pack each level into parent nodes until a single root remains
+        start, end = 0, len(items)
+        self.level_bounds.append(end)
+        while True:
+            for child in range(start, end, node_size):
+                last = min(child + node_size, end)
+                self.boxes.extend((min(self.boxes[4 * j] for j in range(child, last)),
+                                   min(self.boxes[4 * j + 1] for j in range(child, last)),
+                                   max(self.boxes[4 * j + 2] for j in range(child, last)),
+                                   max(self.boxes[4 * j + 3] for j in range(child, last))))
+                self.indices.append(child)
+            start, end = end, len(self.indices)
+            self.level_bounds.append(end)
+            if end - start == 1:
+                break
+
+    def __len__(self):
+        return self.num_items
+
+    def search(self, min_x, min_y, max_x, max_y):
+        """Return the sorted indices of the items whose boxes intersect the
+        given box."""
+        if not self.num_items:
+            return []
+        boxes = self.boxes
+        results = []
+        stack = [len(self.indices) - 1]
+        while stack:
+            first = self.indices[stack.pop()]
+            last = min(first + self.node_size, self.level_bounds[bisect.bisect_right(self.level_bounds, first)])
+            for node in range(first, last):
+                if (boxes[4 * node] > max_x or boxes[4 * node + 1] > max_y or
+                        boxes[4 * node + 2] < min_x or boxes[4 * node + 3] < min_y):
+                    continue
+                if node < self.num_items:
+                    results.append(self.indices[node])
+                else:
+                    stack.append(node)
+        results.sort()
+        return results
+
+
+def hilbert(x, y):
+    """Return the position of (x, y) along a Hilbert curve filling the
+    16-bit square."""
+    a = x ^ y
+    b = 0xFFFF ^ a
+    c = 0xFFFF ^ (x | y)
+    d = x & (y ^ 0xFFFF)
+
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 2)) ^ (b & (b >> 2))
+    B = (a & (b >> 2)) ^ (b & ((a ^ b) >> 2))
+    C ^= (a & (c >> 2)) ^ (b & (d >> 2))
+    D ^= (b & (c >> 2)) ^ ((a ^ b) & (d >> 2))
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 4)) ^ (b & (b >> 4))
+    B = (a & (b >> 4)) ^ (b & ((a ^ b) >> 4))
+    C ^= (a & (c >> 4)) ^ (b & (d >> 4))
+    D ^= (b & (c >> 4)) ^ ((a ^ b) & (d >> 4))
+
+    a, b, c, d = A, B, C, D
+    C ^= (a & (c >> 8)) ^ (b & (d >> 8))
+    D ^= (b & (c >> 8)) ^ ((a ^ b) & (d >> 8))
+
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+
+    i0 = x ^ y
+    i1 = b | (0xFFFF ^ (i0 | a))
+
+    i0 = (i0 | (i0 << 8)) & 0x00FF00FF
+    i0 = (i0 | (i0 << 4)) & 0x0F0F0F0F
+    i0 = (i0 | (i0 << 2)) & 0x33333333
+    i0 = (i0 | (i0 << 1)) & 0x55555555
+
+    i1 = (i1 | (i1 << 8)) & 0x00FF00FF
+    i1 = (i1 | (i1 << 4)) & 0x0F0F0F0F
+    i1 = (i1 | (i1 << 2)) & 0x33333333
+    i1 = (i1 | (i1 << 1)) & 0x55555555
+
+    return (i1 << 1) | i0
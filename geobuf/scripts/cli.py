@@ -7,16 +7,39 @@ streams.
   $ geobuf encode < foo.json > foo.pbf
   $ geobuf decode < foo.pbf > bar.json
 
+`geobuf encode` also reads newline-delimited GeoJSON and RFC 8142 GeoJSON
+text sequences, encoding them as a feature collection.
+
+  $ ogr2ogr -f GeoJSONSeq /vsistdout/ foo.shp | geobuf encode --seq > foo.pbf
+
+Without --seq, a sequence of a single feature is read as a lone feature.
+
+`geobuf merge` writes the features of several geobuf files to stdout as
+one feature collection, without decoding them.
+
+  $ geobuf merge north.pbf south.pbf > all.pbf
+
+`geobuf split` does the opposite, writing shards of a geobuf file to a
+directory and their paths to stdout.
+
+  $ geobuf split --shards 8 all.pbf parts/
+
 """
 
 
 import json
 import logging
+import mmap
+import os
 import sys
 
 import click
 
 import geobuf
+import geobuf.merge
+import geobuf.parallel
+import geobuf.split
+from geobuf.jsonstream import GeoJSONReader, GeoJSONWriter
 
 
 logging.basicConfig(stream=sys.stderr, level=logging.INFO)
@@ -30,6 +53,14 @@ def print_version(ctx, param, value):
     ctx.exit()
 
 
+def read_buffer(stream):
+    """Memory map a binary stream backed by a regular file, or read it."""
+    try:
+        return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        return stream.read()
+
+
 @click.group(help="Pygeobuf command line interface.")
 @click.option('--version', is_flag=True, callback=print_version,
               expose_value=False, is_eager=True,
@@ -43,18 +74,52 @@ def cli():
               help="Decimal encoding precision of coordinates.")
 @click.option('--with-z/--without-z', default=False,
               help="Encode Z coordinate values as well as X, Y.")
-def encode(precision, with_z):
-    """Given GeoJSON on stdin, writes a geobuf file to stdout."""
+@click.option('--jobs', '-j', type=int, default=1,
+              help="Number of processes encoding features (0 for all cores).")
+@click.option('--seq', is_flag=True,
+              help="Read the input as a GeoJSON text sequence even if it holds a single object.")
+@click.option('--auto', is_flag=True,
+              help="Use the smallest lossless precision, up to --precision, and the "
+                   "dimensions of the input. The whole input is read before encoding.")
+@click.option('--stream', is_flag=True,
+              help="Write each feature to stdout as it is encoded, with the keys at the end. "
+                   "The output is read by protobuf-based decoders such as pygeobuf, but may "
+                   "not be by other geobuf implementations.")
+@click.option('--stats', is_flag=True,
+              help="Print timings and counts of the encoding phases to stderr.")
+def encode(precision, with_z, jobs, seq, auto, stream, stats):
+    """Given GeoJSON or a GeoJSON text sequence on stdin, writes a geobuf
+    file to stdout. Features are encoded as they are read unless --jobs is
+    more than 1, and kept in a temporary file until the keys are known
+    unless --stream is given."""
     logger = logging.getLogger('geobuf')
     stdin = click.get_text_stream('stdin')
     sink = click.get_binary_stream('stdout')
+    precision = precision if precision >= 0 else 6
+    dim = 3 if with_z else 2
+    if stats and jobs != 1:
+        raise click.UsageError("--stats requires --jobs 1")
+    stats = geobuf.Stats() if stats else None
     try:
-        data = json.load(stdin)
-        pbf = geobuf.encode(
-            data,
-            precision if precision >= 0 else 6,
-            3 if with_z else 2)
-        sink.write(pbf)
+        reader = GeoJSONReader(stdin, sequence=seq)
+        encoder = geobuf.Encoder(stats=stats)
+        if reader.type not in ('FeatureCollection', 'FeatureSequence'):
+            sink.write(encoder.encode(reader.value, precision, dim, auto=auto))
+        elif jobs == 1:
+            features = reader.features()
+            if auto:
+                features = list(features)
+                precision, dim = encoder.analyze({'type': 'FeatureCollection', 'features': features}, precision)
+            with geobuf.FeatureCollectionWriter(sink, precision, dim, encoder=encoder, spool=not stream) as writer:
+                for feature in features:
+                    writer.write(feature)
+                writer.write_custom_properties(reader.members)
+        else:
+            data = {'type': 'FeatureCollection', 'features': list(reader.features())}
+            data.update(reader.members)
+            sink.write(geobuf.parallel.encode(data, precision, dim, jobs=jobs, auto=auto))
+        if stats is not None:
+            click.echo(stats.report(), err=True)
         sys.exit(0)
     except Exception:
         logger.exception("Failed. Exception caught")
@@ -62,16 +127,81 @@ def encode(precision, with_z):
 
 
 @cli.command(short_help="Decode a Geobuf byte string.")
-def decode():
+@click.option('--jobs', '-j', type=int, default=1,
+              help="Number of processes decoding features (0 for all cores).")
+@click.option('--stats', is_flag=True,
+              help="Print timings and counts of the decoding phases to stderr.")
+def decode(jobs, stats):
     """Given a Geobuf byte string on stdin, write a GeoJSON feature
     collection to stdout."""
     logger = logging.getLogger('geobuf')
     stdin = click.get_binary_stream('stdin')
     sink = click.get_text_stream('stdout')
+    if stats and jobs != 1:
+        raise click.UsageError("--stats requires --jobs 1")
+    stats = geobuf.Stats() if stats else None
+    try:
+        if jobs == 1:
+            GeoJSONWriter(stats=stats).write(read_buffer(stdin), sink)
+        else:
+            json.dump(geobuf.parallel.decode(stdin.read(), jobs=jobs), sink)
+        if stats is not None:
+            click.echo(stats.report(), err=True)
+        sys.exit(0)
+    except Exception:
+        logger.exception("Failed. Exception caught")
+        sys.exit(1)
+
+
+@cli.command(short_help="Merge Geobuf files into one feature collection.")
+@click.argument('inputs', nargs=-1, required=True, type=click.File('rb'))
+@click.option('--rescale/--no-rescale', default=True,
+              help="Scale the coordinates of inputs of lower precision up to the highest one, "
+                   "or fail when the precisions differ.")
+@click.option('--stream', is_flag=True,
+              help="Write each feature to stdout as it is merged, with the keys at the end. "
+                   "The output is read by protobuf-based decoders such as pygeobuf, but may "
+                   "not be by other geobuf implementations.")
+def merge(inputs, rescale, stream):
+    """Given Geobuf files of feature collections or features, write a
+    Geobuf feature collection of all their features to stdout."""
+    logger = logging.getLogger('geobuf')
+    sink = click.get_binary_stream('stdout')
+    try:
+        buffers = [read_buffer(f) for f in inputs]
+        geobuf.merge.merge(buffers, sink, rescale, stream)
+        sys.exit(0)
+    except Exception:
+        logger.exception("Failed. Exception caught")
+        sys.exit(1)
+
+
+@cli.command(short_help="Split a Geobuf file into shards.")
+@click.argument('input', type=click.File('rb'))
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--shards', type=int, help="Number of shards of consecutive features.")
+@click.option('--max-features', type=int, help="Number of consecutive features per shard.")
+@click.option('--max-bytes', type=int, help="Approximate size of the shards of consecutive features.")
+@click.option('--grid', type=float, help="Size of the grid cells that features are assigned to.")
+@click.option('--zoom', type=int, help="Zoom level of the web mercator tiles that features are assigned to.")
+@click.option('--prefix', default='', help="Prefix of the shard file names.")
+def split(input, directory, shards, max_features, max_bytes, grid, zoom, prefix):
+    """Given a Geobuf feature collection, write its features to Geobuf
+    files in a directory, shard by shard, and their paths to stdout. Shard
+    files are named after the shard number, grid cell or quadkey."""
+    logger = logging.getLogger('geobuf')
+    try:
+        shards = geobuf.split.split(read_buffer(input), shards=shards, max_features=max_features,
+                                    max_bytes=max_bytes, grid=grid, zoom=zoom)
+    except ValueError as e:
+        raise click.UsageError(str(e))
     try:
-        pbf = stdin.read()
-        data = geobuf.decode(pbf)
-        json.dump(data, sink)
+        os.makedirs(directory, exist_ok=True)
+        for name, shard in shards:
+            path = os.path.join(directory, '%s%s.pbf' % (prefix, name))
+            with open(path, 'wb') as f:
+                f.write(shard)
+            click.echo(path)
         sys.exit(0)
     except Exception:
         logger.exception("Failed. Exception caught")
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Split an encoded FeatureCollection into shards without decoding its
+features.
+
+Features are assigned to shards in order, by count or by encoded size, or
+spatially by the grid cell or quadkey tile of the center of their bounding
+boxes. Each shard is a FeatureCollection of its own whose key table holds
+only the keys its features use; the key indexes of the features are
+rewritten at the wire level and everything else is copied as it is.
+
+    for name, shard in geobuf.split.split(pbf, shards=8):
+        with open('part-%s.pbf' % name, 'wb') as fp:
+            fp.write(shard)
+"""
+
+import math
+
+from . import geobuf_pb2, wire
+from .decode import Decoder
+from .encode import Encoder
+from .index import FeatureIndex
+from .merge import Feature, read_header, rewrite
+
+
+def split(buffer, shards: int = None, max_features: int = None, max_bytes: int = None, grid: float = None,
+          zoom: int = None):
+    """Split the encoded FeatureCollection or Feature in buffer (bytes,
+    memoryview or mmap), yielding (name, shard bytes) pairs. Exactly one
+    way of splitting is given:
+
+    - shards: this many shards of consecutive features, their counts
+      differing by one at most
+    - max_features: consecutive features, at most this many per shard
+    - max_bytes: consecutive features, at most about this many bytes per
+      shard, unless a single feature is larger
+    - grid: features by the cell of a grid of this size in coordinate units
+    - zoom: features by the quadkey of their web mercator tile at this zoom
+      level, for longitude and latitude coordinates
+
+    Shards in order are named '0', '1', and so on. Grid cells are named
+    after their column and row, like '-3_12', and tiles by their quadkeys.
+    Features without coordinates go to a shard named 'empty' when
+    splitting spatially.
+    """
+    options = {'shards': shards, 'max_features': max_features, 'max_bytes': max_bytes, 'grid': grid, 'zoom': zoom}
+    given = [name for name, value in options.items() if value is not None]
+    if len(given) != 1:
+        raise ValueError("Give exactly one of %s" % ', '.join(options))
+    if given[0] == 'zoom':
+        if zoom < 1:
+            raise ValueError("zoom must be at least 1")
+    elif options[given[0]] <= 0:
+        raise ValueError("%s must be positive" % given[0])
+    return _split(buffer, given[0], options[given[0]])
+
+
+def _split(buffer, how, value):
+    with memoryview(buffer) as buf:
+        decoder = Decoder()
+        data = read_header(decoder, buf)
+        members = decoder.read_custom_properties(buf) if data.WhichOneof('data_type') == 'feature_collection' else {}
+        if how in ('grid', 'zoom'):
+            groups = _spatial_groups(buf, how, value)
+        else:
+            groups = enumerate(_sequential_groups(list(Decoder.feature_spans(buf)), how, value))
+        for name, spans in groups:
+            yield str(name), _shard(buf, spans, data, members)
+
+
+def _sequential_groups(spans, how, value):
+    if how == 'shards':
+        size, extra = divmod(len(spans), value)
+        start = 0
+        for i in range(min(value, len(spans))):
+            end = start + size + (i < extra)
+            yield spans[start:end]
+            start = end
+    elif how == 'max_features':
+        for i in range(0, len(spans), value):
+            yield spans[i:i + value]
+    else:
+        group = []
+        group_size = 0
+        for start, end in spans:
+            if group and group_size + end - start > value:
+                yield group
+                group = []
+                group_size = 0
+            group.append((start, end))
+            group_size += end - start
+        if group:
+            yield group
+
+
+def _spatial_groups(buf, how, value):
+    index = FeatureIndex.build(buf)
+    groups = {}
+    for i, (start, length) in enumerate(zip(index.offsets, index.lengths)):
+        bbox = index.bbox(i)
+        if bbox is None:
+            name = 'empty'
+        else:
+            x = (bbox[0] + bbox[2]) / 2
+            y = (bbox[1] + bbox[3]) / 2
+            if how == 'grid':
+                name = '%d_%d' % (math.floor(x / value), math.floor(y / value))
+            else:
+                name = quadkey(x, y, value)
+        groups.setdefault(name, []).append((start, start + length))
+    return groups.items()
+
+
+def quadkey(lon, lat, zoom):
+    """Return the quadkey of the web mercator tile of a point at zoom."""
+    n = 1 << zoom
+    lat = max(-85.0511287798, min(85.0511287798, lat))
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    x = max(0, min(n - 1, x))
+    y = max(0, min(n - 1, y))
+    return ''.join(str((x >> i & 1) + 2 * (y >> i & 1)) for i in range(zoom - 1, -1, -1))
+
+
+class KeyMapping(dict):
+    """Key indexes of the input to those of a shard, assigned by the
+    shard's encoder as they are first used."""
+
+    def __init__(self, keys, encoder):
+        super().__init__()
+        self.keys = keys
+        self.encoder = encoder
+
+    def __missing__(self, i):
+        index = self[i] = self.encoder.key_index(self.keys[i])
+        return index
+
+
+def _shard(buf, spans, data, members):
+    """Return the features at spans of buf as a FeatureCollection in the
+    layout of Encoder.encode: the keys and header, then one collection."""
+    encoder = Encoder()
+    header = encoder.setup(data.precision, data.dimensions)
+    feature_collection = geobuf_pb2.Data.FeatureCollection()
+    encoder.encode_custom_properties(feature_collection, members, ('type', 'features'), encoder.value_table())
+    mapping = KeyMapping(data.keys, encoder)
+    chunks = [wire.encode_length_delimited(feature_collection.FEATURES_FIELD_NUMBER,
+                                           rewrite(buf, start, end, Feature, mapping, 1)) for start, end in spans]
+    chunks.append(encoder.serialize(feature_collection))
+    return encoder.serialize(header) + wire.encode_length_delimited(
+        header.FEATURE_COLLECTION_FIELD_NUMBER, b''.join(chunks))
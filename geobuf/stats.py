@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Timings and counts of the phases of encoding and decoding.
+
+Pass a Stats object to an Encoder or Decoder to collect them:
+
+    stats = Stats()
+    pbf = Encoder(stats=stats).encode(data)
+    print(stats.report())
+
+The methods of each phase are wrapped on the instrumented object only, so
+an Encoder or Decoder without stats runs exactly as before.
+"""
+
+import collections
+import functools
+import time
+
+
+class Stats:
+    """Time spent in and calls to each phase, positions per geometry type,
+    and the keys and bytes seen, accumulated over every call of the
+    instrumented objects.
+
+    Phases nest: 'features' includes the properties and geometry of each
+    feature, and 'properties' includes 'keys' and 'values'. A phase that
+    calls itself, such as the geometries of a GeometryCollection, is timed
+    once.
+    """
+
+    def __init__(self):
+        self.seconds = collections.defaultdict(float)  # phase -> seconds
+        self.calls = collections.Counter()  # phase -> number of calls
+        self.coords = collections.Counter()  # geometry type -> number of positions
+        self.keys = 0  # keys in the key tables written or read
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._active = set()
+
+    def instrument(self, obj, phases):
+        """Time and count calls to the methods of obj named in the mapping
+        phases of method names to phase names."""
+        for name, phase in phases.items():
+            setattr(obj, name, self.timed(phase, getattr(obj, name)))
+
+    def timed(self, phase, func):
+        """Return func wrapped to add its calls and time to phase."""
+        active = self._active
+        seconds = self.seconds
+        calls = self.calls
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            calls[phase] += 1
+            if phase in active:
+                return func(*args, **kwargs)
+            active.add(phase)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[phase] += perf_counter() - start
+                active.discard(phase)
+
+        return wrapper
+
+    def count_coords(self, geometry_type, count):
+        if count:
+            self.coords[geometry_type] += count
+
+    def as_dict(self):
+        return {
+            'seconds': dict(self.seconds),
+            'calls': dict(self.calls),
+            'coords': dict(self.coords),
+            'keys': self.keys,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+        }
+
+    def report(self):
+        """Return the stats as text, one phase per line."""
+        lines = ['%-12s %10s %10s' % ('phase', 'calls', 'seconds')]
+        for phase in sorted(self.calls, key=lambda phase: -self.seconds[phase]):
+            lines.append('%-12s %10d %10.4f' % (phase, self.calls[phase], self.seconds[phase]))
+        if self.coords:
+            lines.append('positions: ' + ', '.join('%s %d' % item for item in sorted(self.coords.items())))
+        lines.append('keys: %d, bytes read: %d, bytes written: %d' % (
+            self.keys, self.bytes_read, self.bytes_written))
+        return '\n'.join(lines)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for reading and writing the protobuf wire format directly.
+
+They let geobuf files be written and walked one field at a time, without
+building a whole `geobuf_pb2.Data` message in memory.
+"""
+
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+FIXED32 = 5
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def encode_tag(field_number, wire_type):
+    return encode_varint(field_number << 3 | wire_type)
+
+
+def encode_length_delimited(field_number, payload):
+    """Return payload framed as a length-delimited field."""
+    return encode_tag(field_number, LENGTH_DELIMITED) + encode_varint(len(payload)) + payload
+
+
+def encode_packed(field_number, values, zigzag=False):
+    """Return values as a packed repeated varint field, zigzag encoded (as
+    sint32/sint64 are) if zigzag is set."""
+    if zigzag:
+        values = [zigzag_encode(n) for n in values]
+    return encode_length_delimited(field_number, b''.join(encode_varint(n) for n in values))
+
+
+def encode_field(buf, field_number, wire_type, value):
+    """Return a field yielded by iter_fields encoded again, copying its
+    payload from buf."""
+    if wire_type == VARINT:
+        return encode_tag(field_number, wire_type) + encode_varint(value)
+    elif wire_type == LENGTH_DELIMITED:
+        return encode_length_delimited(field_number, buf[value[0]:value[1]])
+    return encode_tag(field_number, wire_type) + buf[value[0]:value[1]]
+
+
+def decode_varint(buf, pos):
+    """Read a varint from buf at pos and return (value, new pos)."""
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def iter_fields(buf, pos=0, end=None):
+    """Yield (field number, wire type, value) for the fields in buf[pos:end].
+
+    Varint values are returned as ints. Other values are returned as the
+    (start, end) offsets of their payload in buf, so nothing is copied.
+    """
+    if end is None:
+        end = len(buf)
+    while pos < end:
+        key, pos = decode_varint(buf, pos)
+        field_number, wire_type = key >> 3, key & 7
+        if wire_type == VARINT:
+            value, pos = decode_varint(buf, pos)
+        elif wire_type == LENGTH_DELIMITED:
+            length, pos = decode_varint(buf, pos)
+            value = (pos, pos + length)
+            pos += length
+        elif wire_type == FIXED64:
+            value = (pos, pos + 8)
+            pos += 8
+        elif wire_type == FIXED32:
+            value = (pos, pos + 4)
+            pos += 4
+        else:
+            raise ValueError("Unsupported wire type %d at offset %d" % (wire_type, pos))
+        if pos > end:
+            raise ValueError("Truncated field %d" % field_number)
+        yield field_number, wire_type, value
+
+
+def decode_packed(buf, start, end, zigzag=False):
+    """Return the list of varints packed in buf[start:end], zigzag decoded
+    (as sint32/sint64 are) if zigzag is set."""
+    if zigzag:
+        return [(n >> 1) ^ -(n & 1) for n in decode_packed(buf, start, end)]
+    values = []
+    append = values.append
+    pos = start
+    while pos < end:
+        b = buf[pos]
+        pos += 1
+        if b < 0x80:
+            append(b)
+            continue
+        result = b & 0x7f
+        shift = 7
+        while True:
+            b = buf[pos]
+            pos += 1
+            result |= (b & 0x7f) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        append(result)
+    return values
+
+
+def zigzag_decode(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def zigzag_encode(value):
+    return (value << 1) ^ (value >> 63)
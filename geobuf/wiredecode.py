@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+A decoder that reads the geobuf wire format directly.
+
+WireDecoder walks the varints, length-delimited fields and packed repeated
+fields of an encoded Data message itself, building GeoJSON as it goes,
+instead of materializing a geobuf_pb2.Data object graph first and reading
+it back through message accessors. Select it with
+geobuf.decode(pbf, backend='wire').
+"""
+
+import itertools
+import json
+import struct
+import types
+
+from . import geobuf_pb2, wire
+from .decode import Decoder
+from .stats import Stats
+
+Data = geobuf_pb2.Data
+
+
+class WireDecoder(Decoder):
+    """Drop-in replacement for Decoder; the results are the same."""
+
+    instrumented = {
+        'read_feature': 'features',
+        'add_properties': 'properties',
+        'read_value': 'values',
+        'read_geometry': 'geometry',
+    }
+
+    def __init__(self, stats: Stats = None):
+        super().__init__(stats)
+        self.keys = []
+
+    def decode_message(self, data_str: bytes):
+        if isinstance(data_str, bytes):
+            return self.read_message(data_str)
+        # Other buffers, such as an mmap of a large file, are read in place.
+        with memoryview(data_str) as buf:
+            return self.read_message(buf.cast('B') if buf.format != 'B' else buf)
+
+    def read_message(self, buf):
+
+        self.keys = []
+        dim = precision = 0
+        data_type = None
+        spans = []
+        for field_number, wire_type, value in wire.iter_fields(buf):
+            if field_number == Data.KEYS_FIELD_NUMBER:
+                self.keys.append(str(buf[value[0]:value[1]], 'utf-8'))
+            elif field_number == Data.DIMENSIONS_FIELD_NUMBER:
+                dim = value
+            elif field_number == Data.PRECISION_FIELD_NUMBER:
+                precision = value
+            elif field_number in (Data.FEATURE_COLLECTION_FIELD_NUMBER, Data.FEATURE_FIELD_NUMBER,
+                                  Data.GEOMETRY_FIELD_NUMBER):
+                if field_number != data_type:
+                    data_type = field_number
+                    spans = []
+                spans.append(value)
+
+        self.e = pow(10, precision)
+        self.dim = dim
+        self.prepare_filters(self.keys)
+        if self.stats is not None:
+            self.stats.keys += len(self.keys)
+            self.stats.bytes_read += len(buf)
+
+        if data_type == Data.FEATURE_COLLECTION_FIELD_NUMBER:
+            return self.read_feature_collection(buf, spans)
+        elif len(spans) > 1:
+            # repeated occurrences of a message field are merged
+            buf = b''.join(buf[start:end] for start, end in spans)
+            spans = [(0, len(buf))]
+        if data_type == Data.FEATURE_FIELD_NUMBER:
+            return self.read_feature(buf, *spans[0], filtered=True)
+        elif data_type == Data.GEOMETRY_FIELD_NUMBER:
+            self.check_where_geometry()
+            return self.read_geometry(buf, *spans[0])
+
+    def read_feature_collection(self, buf, spans):
+        obj = {'type': 'FeatureCollection', 'features': []}
+        features = obj['features']
+        values = []
+        custom_properties = []
+        for span in spans:
+            for field_number, wire_type, value in wire.iter_fields(buf, *span):
+                if field_number == Data.FeatureCollection.FEATURES_FIELD_NUMBER:
+                    feature = self.read_feature(buf, *value, filtered=True)
+                    if feature is not None:
+                        features.append(feature)
+                elif field_number == Data.FeatureCollection.VALUES_FIELD_NUMBER:
+                    values.append(value)
+                elif field_number == Data.FeatureCollection.CUSTOM_PROPERTIES_FIELD_NUMBER:
+                    custom_properties.extend(self.read_packed(buf, wire_type, value))
+        self.add_properties(buf, custom_properties, values, obj)
+        return obj
+
+    def read_feature(self, buf, start, end, filtered=False):
+        """Decode the Feature in buf[start:end]; with filtered set, return
+        None instead if it does not match the where option."""
+        geometry = (0, 0)
+        feature_id = None
+        values = []
+        properties = []
+        custom_properties = []
+        for field_number, wire_type, value in wire.iter_fields(buf, start, end):
+            if field_number == Data.Feature.GEOMETRY_FIELD_NUMBER:
+                geometry = value
+            elif field_number == Data.Feature.ID_FIELD_NUMBER:
+                feature_id = str(buf[value[0]:value[1]], 'utf-8')
+            elif field_number == Data.Feature.INT_ID_FIELD_NUMBER:
+                feature_id = wire.zigzag_decode(value)
+            elif field_number == Data.Feature.VALUES_FIELD_NUMBER:
+                values.append(value)
+            elif field_number == Data.Feature.PROPERTIES_FIELD_NUMBER:
+                properties.extend(self.read_packed(buf, wire_type, value))
+            elif field_number == Data.Feature.CUSTOM_PROPERTIES_FIELD_NUMBER:
+                custom_properties.extend(self.read_packed(buf, wire_type, value))
+
+        if filtered and not self.matches(properties, lambda i: self.read_value(buf, *values[i]), self.keys):
+            return None
+
+        obj = {'type': 'Feature'}
+        self.add_properties(buf, custom_properties, values, obj)
+        if feature_id is not None:
+            obj['id'] = feature_id
+        obj['geometry'] = self.read_geometry(buf, *geometry) if self.geometry else None
+        if properties:
+            obj['properties'] = self.add_properties(buf, properties, values, {}, self.property_indexes)
+        return obj
+
+    def read_geometry(self, buf, start, end):
+        geometry = types.SimpleNamespace(type=0, lengths=[], coords=[])
+        geometries = []
+        values = []
+        custom_properties = []
+        for field_number, wire_type, value in wire.iter_fields(buf, start, end):
+            if field_number == Data.Geometry.TYPE_FIELD_NUMBER:
+                geometry.type = value
+            elif field_number == Data.Geometry.LENGTHS_FIELD_NUMBER:
+                geometry.lengths.extend(self.read_packed(buf, wire_type, value))
+            elif field_number == Data.Geometry.COORDS_FIELD_NUMBER:
+                geometry.coords.extend(self.read_packed(buf, wire_type, value, zigzag=True))
+            elif field_number == Data.Geometry.GEOMETRIES_FIELD_NUMBER:
+                geometries.append(value)
+            elif field_number == Data.Geometry.VALUES_FIELD_NUMBER:
+                values.append(value)
+            elif field_number == Data.Geometry.CUSTOM_PROPERTIES_FIELD_NUMBER:
+                custom_properties.extend(self.read_packed(buf, wire_type, value))
+
+        gt = self.geometry_types[geometry.type]
+        obj = {'type': gt}
+        self.add_properties(buf, custom_properties, values, obj)
+
+        if gt == 'GeometryCollection':
+            obj['geometries'] = [self.read_geometry(buf, *span) for span in geometries]
+        elif gt == 'Point':
+            obj['coordinates'] = self.decode_point(geometry.coords)
+        elif gt in ('MultiPoint', 'LineString'):
+            obj['coordinates'] = self.decode_line(geometry.coords)
+        elif gt == 'MultiLineString':
+            obj['coordinates'] = self.decode_multi_line(geometry)
+        elif gt == 'Polygon':
+            obj['coordinates'] = self.decode_multi_line(geometry, is_closed=True)
+        elif gt == 'MultiPolygon':
+            obj['coordinates'] = self.decode_multi_polygon(geometry)
+
+        if self.stats is not None:
+            self.stats.count_coords(gt, len(geometry.coords) // self.dim)
+        return obj
+
+    def add_properties(self, buf, props, values, dest, indexes=None):
+        """Decode key/value index pairs into dest, where values holds the
+        offsets of the encoded values, skipping keys whose index is not in
+        indexes if given."""
+        keys = self.keys
+        for i in range(0, len(props), 2):
+            if indexes is not None and props[i] not in indexes:
+                continue
+            value = self.read_value(buf, *values[props[i + 1]])
+            if value is not None:
+                dest[keys[props[i]]] = value
+        return dest
+
+    @staticmethod
+    def read_packed(buf, wire_type, value, zigzag=False):
+        if wire_type == wire.VARINT:
+            return [wire.zigzag_decode(value) if zigzag else value]
+        return wire.decode_packed(buf, *value, zigzag=zigzag)
+
+    def decode_line(self, coords, is_closed=False):
+        if self.use_numpy:
+            return super().decode_line(coords, is_closed)
+        e = self.e
+        columns = [[x / e for x in itertools.accumulate(coords[j::self.dim])] for j in range(self.dim)]
+        obj = [list(point) for point in zip(*columns)]
+        if is_closed and obj:
+            obj.append(list(obj[0]))
+        return obj
+
+    @staticmethod
+    def read_value(buf, start, end):
+        """Return the Python value of an encoded Value, or None if it is unset."""
+        result = None
+        for field_number, wire_type, value in wire.iter_fields(buf, start, end):
+            if field_number == Data.Value.STRING_VALUE_FIELD_NUMBER:
+                result = str(buf[value[0]:value[1]], 'utf-8')
+            elif field_number == Data.Value.DOUBLE_VALUE_FIELD_NUMBER:
+                result = struct.unpack_from('<d', buf, value[0])[0]
+            elif field_number == Data.Value.POS_INT_VALUE_FIELD_NUMBER:
+                result = value
+            elif field_number == Data.Value.NEG_INT_VALUE_FIELD_NUMBER:
+                result = -value
+            elif field_number == Data.Value.BOOL_VALUE_FIELD_NUMBER:
+                result = bool(value)
+            elif field_number == Data.Value.JSON_VALUE_FIELD_NUMBER:
+                result = json.loads(str(buf[value[0]:value[1]], 'utf-8'))
+        return result
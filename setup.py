@@ -19,7 +19,8 @@ setup(name='geobuf',
       zip_safe=False,
       install_requires=['click', 'protobuf', 'six'],
       extras_require={
-          'test': ['pytest'],
+          'numpy': ['numpy'],
+          'test': ['pytest', 'numpy'],
       },
       entry_points="""
       [console_scripts]
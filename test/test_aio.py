@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import glob
+import io
+import json
+import os
+
+import pytest
+
+import geobuf
+from geobuf import aio
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+def reader(data, chunk_size=None):
+    """Return a StreamReader holding data, fed in chunks if chunk_size is set."""
+    stream = asyncio.StreamReader()
+    chunk_size = chunk_size or len(data) or 1
+    for i in range(0, len(data), chunk_size):
+        stream.feed_data(data[i:i + chunk_size])
+    stream.feed_eof()
+    return stream
+
+
+def collection(n):
+    return {'type': 'FeatureCollection', 'name': 'points', 'features': [{
+        'type': 'Feature',
+        'id': i,
+        'geometry': {'type': 'Point', 'coordinates': [i, i / 2], 'key_%d' % (i % 3): i},
+        'properties': {'key_%d' % (i % 4): i},
+    } for i in range(n)]}
+
+
+@pytest.mark.parametrize("filename", files)
+def test_decode_async(filename):
+    with open(filename) as f:
+        pbf = geobuf.encode(json.load(f))
+
+    async def decode():
+        return [await geobuf.decode_async(reader(pbf), chunk_size=5),
+                await geobuf.decode_async(reader(pbf, 3), chunk_size=64),
+                await geobuf.decode_async(pbf)]
+
+    assert asyncio.run(decode()) == [geobuf.decode(pbf)] * 3
+
+
+def test_iter_features_writer():
+    # features written before the keys are held until the keys arrive
+    geojson = collection(10)
+    fp = io.BytesIO()
+    with geobuf.FeatureCollectionWriter(fp) as writer:
+        for feature in geojson['features']:
+            writer.write(feature)
+        writer.write_custom_properties(geojson)
+
+    async def decode():
+        return ([f async for f in aio.iter_features(reader(fp.getvalue(), 7), chunk_size=16)],
+                await geobuf.decode_async(reader(fp.getvalue()), chunk_size=16))
+
+    features, decoded = asyncio.run(decode())
+    assert features == geojson['features']
+    assert decoded == geojson
+
+
+def test_iter_features_incremental():
+    pbf = geobuf.encode(collection(100))
+    half = len(pbf) // 2
+
+    async def decode():
+        stream = asyncio.StreamReader()
+        stream.feed_data(pbf[:half])
+        features = aio.iter_features(stream, chunk_size=half)
+        first = await asyncio.wait_for(features.__anext__(), 1)
+        stream.feed_data(pbf[half:])
+        stream.feed_eof()
+        return [first] + [f async for f in features]
+
+    assert asyncio.run(decode()) == collection(100)['features']
+
+
+def test_iter_features_options():
+    pbf = geobuf.encode(collection(20))
+
+    async def decode():
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            features = aio.iter_features(reader(pbf), executor, chunk_size=32, where={'key_1': 5}, geometry=False)
+            return [f async for f in features]
+
+    assert asyncio.run(decode()) == [{'type': 'Feature', 'id': 5, 'geometry': None, 'properties': {'key_1': 5}}]
+
+
+def test_iter_features_errors():
+    async def decode(pbf):
+        return [f async for f in aio.iter_features(reader(pbf))]
+
+    with pytest.raises(ValueError):
+        asyncio.run(decode(geobuf.encode({'type': 'Point', 'coordinates': [1, 2]})))
+    with pytest.raises(ValueError):
+        asyncio.run(decode(geobuf.encode(collection(3))[:-3]))
+
+
+def test_encode_async():
+    geojson = collection(5)
+    assert asyncio.run(geobuf.encode_async(geojson, precision=1)) == geobuf.encode(geojson, precision=1)
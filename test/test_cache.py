@@ -0,0 +1,92 @@
+import concurrent.futures
+import glob
+import json
+import os
+import pickle
+
+import pytest
+
+import geobuf
+from geobuf.cache import DecodeCache, FrozenDict, freeze, thaw
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+def tile(i):
+    return geobuf.encode({'type': 'FeatureCollection', 'features': [{
+        'type': 'Feature', 'id': i,
+        'geometry': {'type': 'LineString', 'coordinates': [[i, j] for j in range(10)]},
+        'properties': {'name': 'tile %d' % i, 'tags': {'a': [1, 2]}},
+    }]})
+
+
+@pytest.mark.parametrize("filename", files)
+def test_decode(filename):
+    with open(filename) as f:
+        pbf = geobuf.encode(json.load(f))
+    cache = DecodeCache()
+    result = cache.decode(pbf)
+    assert thaw(result) == geobuf.decode(pbf)
+    assert cache.decode(bytearray(pbf)) is result
+    assert cache.cache_info()[:4] == (1, 1, 0, 1)
+
+
+def test_frozen():
+    result = DecodeCache().decode(tile(1))
+    feature = result['features'][0]
+    assert isinstance(result, FrozenDict)
+    assert isinstance(result['features'], tuple)
+    assert feature['geometry']['coordinates'][0] == (1.0, 0.0)
+    for mutate in (lambda: result.update(a=1), lambda: feature.pop('id'), lambda: feature['properties'].clear()):
+        with pytest.raises(TypeError):
+            mutate()
+    with pytest.raises(TypeError):
+        feature['properties']['tags']['a'] = 3
+    assert json.loads(json.dumps(result)) == geobuf.decode(tile(1))
+    assert pickle.loads(pickle.dumps(result)) == result
+
+
+def test_eviction():
+    size = freeze(geobuf.decode(tile(0)))[1]
+    cache = DecodeCache(max_bytes=size * 3 + size // 2)
+    for i in range(4):
+        cache.decode(tile(i), key=i)
+    assert 0 not in cache and all(i in cache for i in (1, 2, 3))
+    cache.decode(tile(1), key=1)
+    cache.decode(tile(4), key=4)
+    assert 2 not in cache and 1 in cache
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.entries) == (1, 5, 2, 3)
+    assert info.bytes <= info.max_bytes
+
+    # results larger than the cache are not kept
+    cache = DecodeCache(max_bytes=size // 2)
+    assert thaw(cache.decode(tile(0))) == geobuf.decode(tile(0))
+    assert len(cache) == 0
+    cache.clear()
+    assert cache.cache_info() == (0, 0, 0, 0, 0, size // 2)
+
+
+def test_options():
+    cache = DecodeCache(decoder=geobuf.WireDecoder, properties=['name'], geometry=False)
+    feature = cache.decode(tile(2))['features'][0]
+    assert thaw(feature) == {'type': 'Feature', 'id': 2, 'geometry': None, 'properties': {'name': 'tile 2'}}
+
+
+def test_numpy():
+    pytest.importorskip('numpy')
+    result = DecodeCache(as_arrays=True).decode(tile(3))
+    coords = result['features'][0]['geometry']['coordinates']
+    assert not coords.flags.writeable
+    with pytest.raises(ValueError):
+        coords[0, 0] = 1
+
+
+def test_threads():
+    cache = DecodeCache()
+    tiles = [tile(i % 5) for i in range(200)]
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(cache.decode, tiles))
+    assert all(thaw(result) == geobuf.decode(pbf) for result, pbf in zip(results, tiles))
+    info = cache.cache_info()
+    assert info.entries == 5 and info.hits + info.misses == 200
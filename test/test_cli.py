@@ -1,9 +1,11 @@
+import json
 import os.path
 
 from click.testing import CliRunner
 import pytest
 
 import geobuf
+from geobuf import wire
 from geobuf.scripts.cli import cli
 
 
@@ -43,3 +45,112 @@ def test_cli_roundtrip(props_json):
     assert result.exit_code == 0
     assert "@context" in result.output
     assert result.output.count("Feature") == 6
+
+
+def test_cli_roundtrip_jobs(props_json):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode', '--jobs', '2'], input=props_json)
+    assert result.exit_code == 0
+    assert result.stdout_bytes == geobuf.encode(json.loads(props_json))
+    result = runner.invoke(cli, ['decode', '-j', '2'], input=result.stdout_bytes)
+    assert result.exit_code == 0
+    assert json.loads(result.output) == json.loads(props_json)
+
+
+def test_cli_encode_stream(props_json):
+    geojson = json.loads(props_json)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode'], input=props_json)
+    assert result.exit_code == 0
+    assert geobuf.decode(result.stdout_bytes) == geojson
+
+
+def test_cli_encode_layout(props_json):
+    # keys and header first and a single feature collection, unless --stream
+    geojson = json.loads(props_json)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode'], input=props_json)
+    assert result.exit_code == 0
+    fields = [field_number for field_number, _, _ in wire.iter_fields(result.stdout_bytes)]
+    assert fields == [1] * fields.count(1) + [2, 3, 4]
+    assert geobuf.WireDecoder().decode(result.stdout_bytes) == geojson
+
+    result = runner.invoke(cli, ['encode', '--stream'], input=props_json)
+    assert result.exit_code == 0
+    fields = [field_number for field_number, _, _ in wire.iter_fields(result.stdout_bytes)]
+    assert fields.count(4) == len(geojson['features']) + 1
+    assert geobuf.decode(result.stdout_bytes) == geojson
+
+
+@pytest.mark.parametrize("args", [[], ['--jobs', '2']])
+def test_cli_encode_auto(props_json, args):
+    geojson = json.loads(props_json)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode', '--auto'] + args, input=props_json)
+    assert result.exit_code == 0
+    assert geobuf.decode(result.stdout_bytes) == geojson
+    decoder = geobuf.Decoder()
+    decoder.decode(result.stdout_bytes)
+    assert (decoder.data.precision, decoder.data.dimensions) == geobuf.Encoder.analyze(geojson)
+
+
+@pytest.mark.parametrize("separator", ["\n", "\x1e"])
+def test_cli_encode_seq(props_json, separator):
+    features = json.loads(props_json)['features']
+    text = ''.join(separator + json.dumps(f) + '\n' for f in features)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode'], input=text)
+    assert result.exit_code == 0
+    assert geobuf.decode(result.stdout_bytes) == {'type': 'FeatureCollection', 'features': features}
+
+
+def test_cli_encode_single_feature(props_json):
+    feature = json.loads(props_json)['features'][0]
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode'], input=json.dumps(feature))
+    assert result.exit_code == 0
+    assert result.stdout_bytes == geobuf.encode(feature)
+
+
+def test_cli_encode_seq_single_feature(props_json):
+    # a newline-delimited sequence of one feature is still a collection with --seq
+    feature = json.loads(props_json)['features'][0]
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode', '--seq'], input=json.dumps(feature) + '\n')
+    assert result.exit_code == 0
+    assert geobuf.decode(result.stdout_bytes) == {'type': 'FeatureCollection', 'features': [feature]}
+    result = runner.invoke(cli, ['encode'], input=json.dumps(feature) + '\n')
+    assert result.stdout_bytes == geobuf.encode(feature)
+
+
+def test_cli_merge(props_json, tmpdir):
+    geojson = json.loads(props_json)
+    point = {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [1.5, 2]}, 'properties': {'x': 1}}
+    paths = [str(tmpdir.join('props.pbf')), str(tmpdir.join('point.pbf'))]
+    for path, obj in zip(paths, (geojson, point)):
+        with open(path, 'wb') as f:
+            f.write(geobuf.encode(obj, precision=1))
+    runner = CliRunner()
+    result = runner.invoke(cli, ['merge'] + paths)
+    assert result.exit_code == 0
+    merged = geobuf.decode(result.stdout_bytes)
+    assert merged['features'] == geobuf.decode(geobuf.encode(geojson, precision=1))['features'] + [point]
+
+
+def test_cli_split(props_json, tmpdir):
+    path = str(tmpdir.join('props.pbf'))
+    with open(path, 'wb') as f:
+        f.write(geobuf.encode(json.loads(props_json)))
+    runner = CliRunner()
+    result = runner.invoke(cli, ['split', '--shards', '2', '--prefix', 'part-', path, str(tmpdir.join('parts'))])
+    assert result.exit_code == 0
+    paths = result.output.split()
+    assert [os.path.basename(p) for p in paths] == ['part-0.pbf', 'part-1.pbf']
+    features = []
+    for p in paths:
+        with open(p, 'rb') as f:
+            features.extend(geobuf.decode(f.read())['features'])
+    assert features == json.loads(props_json)['features']
+
+    result = runner.invoke(cli, ['split', path, str(tmpdir.join('parts'))])
+    assert result.exit_code == 2
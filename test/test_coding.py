@@ -1,11 +1,14 @@
 import glob
+import io
 import json
 import os
 import math
+import mmap
 
 import pytest
 
-from geobuf import Decoder, Encoder
+import geobuf
+from geobuf import Decoder, Encoder, FeatureCollectionWriter
 
 exclude = {'precision.json'}
 files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
@@ -111,3 +114,296 @@ def test_dimensions():
     dim_orig = feature['coordinates'][0][0]
     dim3 = dim3['coordinates'][0][0]
     assert dim3 == dim_orig
+
+
+def test_keys_interned():
+    geojson = {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [i, i]},
+            'properties': {'a': i, 'b': i, 'c': i},
+        } for i in range(3)],
+    }
+    encoder = Encoder()
+    pbf = encoder.encode(geojson)
+    assert list(encoder.data.keys) == ['a', 'b', 'c']
+    assert encoder.keys == {'a': 0, 'b': 1, 'c': 2}
+    # A reused encoder starts with a fresh key table.
+    assert encoder.encode(geojson) == pbf
+    assert Decoder().decode(pbf) == geojson
+
+
+def test_coding_many():
+    objects = [json.loads(open(filename).read()) for filename in coding_fixtures]
+    encoded = geobuf.encode_many(objects, precision=7)
+    assert encoded == [Encoder().encode(obj, precision=7) for obj in objects]
+    for backend in geobuf.decoders:
+        assert geobuf.decode_many(encoded, backend=backend) == objects
+    # options apply to every message
+    features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [i, i]},
+                 'properties': {'a': i, 'b': -i}} for i in range(3)]
+    decoded = Decoder().decode_many(Encoder().encode_many(features), properties=['b'], geometry=False)
+    assert decoded == [{'type': 'Feature', 'geometry': None, 'properties': {'b': -i}} for i in range(3)]
+
+
+@pytest.mark.parametrize("filename", coding_fixtures)
+def test_coding_dedupe_values(filename):
+    geojson = json.loads(open(filename).read())
+    pb = Encoder().encode(geojson, dedupe_values=True)
+    assert Decoder().decode(pb) == geojson
+    assert len(pb) <= len(Encoder().encode(geojson))
+
+
+def test_dedupe_values():
+    feature = {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [0, 0], 'kind': 'residential'},
+        'properties': {'a': 'residential', 'b': 'residential', 'c': 0, 'd': 0.0, 'e': True, 'f': 1},
+        'kind': 'residential',
+    }
+    encoder = Encoder()
+    pb = encoder.encode(feature, dedupe_values=True)
+    values = encoder.data.feature.values
+    assert [v.WhichOneof('value_type') for v in values] == [
+        'string_value', 'pos_int_value', 'bool_value', 'pos_int_value']
+    assert list(encoder.data.feature.properties) == [0, 0, 1, 0, 2, 1, 3, 1, 4, 2, 5, 3]
+    # Geometry values are a separate table.
+    assert len(encoder.data.feature.geometry.values) == 1
+    assert Decoder().decode(pb) == feature
+
+
+@pytest.mark.parametrize("filename", coding_fixtures)
+def test_coding_auto(filename):
+    geojson = json.loads(open(filename).read())
+    pbf = Encoder().encode(geojson, auto=True)
+    assert Decoder().decode(pbf) == geojson
+    assert len(pbf) <= len(Encoder().encode(geojson))
+
+
+def test_analyze():
+    line = {'type': 'LineString', 'coordinates': [[1, 2], [1.5, 2.25], [3, 4]]}
+    assert Encoder.analyze(line) == (2, 2)
+    assert Encoder.analyze({'type': 'Point', 'coordinates': [1, 2]}) == (0, 2)
+    assert Encoder.analyze({'type': 'Point', 'coordinates': [1 / 3, 2]}) == (6, 2)
+    assert Encoder.analyze({'type': 'Point', 'coordinates': [1 / 3, 2]}, max_precision=3) == (3, 2)
+    collection = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': line, 'properties': {}},
+        {'type': 'Feature', 'geometry': {'type': 'GeometryCollection', 'geometries': [
+            {'type': 'MultiPolygon', 'coordinates': [[[[0, 0, 1], [1, 0, 1.125], [1, 1, 1], [0, 0, 1]]]]}]},
+         'properties': {}},
+    ]}
+    assert Encoder.analyze(collection) == (3, 3)
+
+    # 2D positions in 3D data are padded with z = 0
+    collection['features'].append(
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [1.5, 2.25]}, 'properties': {}})
+    encoder = Encoder()
+    pbf = encoder.encode(collection, auto=True)
+    assert (encoder.data.precision, encoder.data.dimensions) == (3, 3)
+    features = Decoder().decode(pbf)['features']
+    assert features[0]['geometry']['coordinates'] == [[1, 2, 0], [1.5, 2.25, 0], [3, 4, 0]]
+    assert features[1]['geometry'] == collection['features'][1]['geometry']
+    assert features[2]['geometry'] == collection['features'][2]['geometry']
+    mixed = {'type': 'LineString', 'coordinates': [[1, 2], [1.5, 2.25, 10], [3, 4]]}
+    assert Decoder().decode(Encoder().encode(mixed, auto=True))['coordinates'] == [
+        [1, 2, 0], [1.5, 2.25, 10], [3, 4, 0]]
+
+
+def test_analyze_numpy():
+    pytest.importorskip('numpy')
+    for filename in files:
+        geojson = json.loads(open(filename).read())
+        assert Encoder.analyze(geojson, use_numpy=True) == Encoder.analyze(geojson)
+        assert Encoder().encode(geojson, auto=True, use_numpy=True) == Encoder().encode(geojson, auto=True)
+    for coordinates in ([[1, 2], [1.5, 2.25, 10], [3, 4]], [[1, 2], [3, 4]]):
+        mixed = {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'geometry': {'type': 'LineString', 'coordinates': coordinates}, 'properties': {}},
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [1, 2, 3]}, 'properties': {}}]}
+        assert Encoder().encode(mixed, auto=True, use_numpy=True) == Encoder().encode(mixed, auto=True)
+
+
+def circle(n, radius=1.0, x=0.0, y=0.0):
+    points = [[x + radius * math.cos(2 * math.pi * i / n), y + radius * math.sin(2 * math.pi * i / n)]
+              for i in range(n)]
+    return points + [points[0]]
+
+
+def test_simplify():
+    polygon = {'type': 'Polygon', 'coordinates': [circle(1000), circle(100, 0.1)]}
+    pbf = Encoder().encode(polygon)
+    assert Encoder().encode(polygon, simplify=0) == pbf
+    simplified = Encoder().encode(polygon, simplify=0.001)
+    assert len(simplified) < len(pbf) / 4
+    rings = Decoder().decode(simplified)['coordinates']
+    assert len(rings[0]) < 1001 and len(rings[1]) < 101
+    for ring, original in zip(rings, polygon['coordinates']):
+        assert ring[0] == ring[-1] == [round(c, 6) for c in original[0]]
+        assert all(abs(math.hypot(x, y) - math.hypot(*original[1])) < 0.001 for x, y in ring)
+
+    # rings keep 4 points however large the tolerance
+    multipolygon = {'type': 'MultiPolygon', 'coordinates': [[circle(50)], [circle(8, 0.5, 3, 3)]]}
+    decoded = Decoder().decode(Encoder().encode(multipolygon, simplify=10))
+    assert [len(polygon[0]) for polygon in decoded['coordinates']] == [4, 4]
+    # lines keep both ends
+    line = {'type': 'LineString', 'coordinates': [[0, 0], [1, 0.5], [2, 0.25], [3, 0]]}
+    assert Decoder().decode(Encoder().encode(line, simplify=1))['coordinates'] == [[0, 0], [3, 0]]
+
+
+def test_simplify_zero_deltas():
+    # points that round to the same coordinates are dropped
+    line = {'type': 'LineString', 'coordinates': [[0, 0], [0.0000001, 0], [1, 1], [1, 1.0000004], [2, 0]]}
+    encoder = Encoder()
+    encoder.encode(line, simplify=0)
+    assert 0 not in list(encoder.data.geometry.coords[2:])
+    assert Decoder().decode(encoder.encode(line, simplify=0))['coordinates'] == [[0, 0], [1, 1], [2, 0]]
+    # a line that collapses to one point keeps both ends
+    line = {'type': 'LineString', 'coordinates': [[1, 1], [1, 1.0000001]]}
+    assert Decoder().decode(Encoder().encode(line, simplify=0))['coordinates'] == [[1, 1], [1, 1]]
+    # multipoints and rings with fewer than 4 distinct points on the grid are unchanged
+    for geometry in ({'type': 'MultiPoint', 'coordinates': [[0, 0], [0, 0], [1, 1]]},
+                     {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [1, 1], [0, 0]]]}):
+        assert Encoder().encode(geometry, simplify=1) == Encoder().encode(geometry)
+
+
+def test_simplify_3d():
+    line = {'type': 'LineString', 'coordinates': [[0, 0, 5], [1, 0.0001, 6], [2, 0, 7]]}
+    decoded = Decoder().decode(Encoder().encode(line, dim=3, simplify=0.01))
+    assert decoded['coordinates'] == [[0, 0, 5], [2, 0, 7]]
+    # points that differ only in z are not duplicates, nor on the segment
+    line = {'type': 'LineString', 'coordinates': [[0, 0, 1], [0, 0, 5], [1, 1, 9]]}
+    assert Decoder().decode(Encoder().encode(line, 6, 3, simplify=0.0)) == line
+    line = {'type': 'LineString', 'coordinates': [[0, 0, 1], [0, 0, 1.0000001], [1, 1, 9]]}
+    assert Decoder().decode(Encoder().encode(line, 6, 3, simplify=0.0))['coordinates'] == [[0, 0, 1], [1, 1, 9]]
+
+
+@pytest.mark.parametrize("filename", coding_fixtures)
+def test_coding_numpy(filename):
+    pytest.importorskip('numpy')
+    geojson = json.loads(open(filename).read())
+    assert Encoder().encode(geojson, use_numpy=True) == Encoder().encode(geojson)
+
+
+def test_line_accumulating_error_numpy():
+    pytest.importorskip('numpy')
+    points = [[i * 1.00000049, 0] for i in range(0, 41)] + [[0, 0]]
+    for geometry in ({'type': 'LineString', 'coordinates': points},
+                     {'type': 'Polygon', 'coordinates': [points, points]},
+                     {'type': 'MultiPolygon', 'coordinates': [[points], [points, points]]}):
+        assert Encoder().encode(geometry, use_numpy=True) == Encoder().encode(geometry)
+    points = [[i * 1.00000049, 0, -i * 0.5] for i in range(0, 41)]
+    line = {'type': 'LineString', 'coordinates': points}
+    assert Encoder().encode(line, dim=3, use_numpy=True) == Encoder().encode(line, dim=3)
+
+
+@pytest.mark.parametrize("coordinates", [
+    [[1e13, 1], [2, 3]],  # beyond int64 once scaled
+    [[9e12, 1], [-9e12, 3]],  # each point fits, their difference does not
+    [[0, 0], [1, 1], [9e12, 1], [-9e12, 3]],
+])
+def test_out_of_range_numpy(coordinates):
+    pytest.importorskip('numpy')
+    line = {'type': 'LineString', 'coordinates': coordinates}
+    for use_numpy in (False, True):
+        with pytest.raises(ValueError):
+            Encoder().encode(line, use_numpy=use_numpy)
+    # a line starting far from the end of the previous one is fine
+    lines = {'type': 'MultiLineString', 'coordinates': [[[9e12, 1], [9e12, 2]], [[-9e12, 3], [-9e12, 4]]]}
+    assert Encoder().encode(lines, use_numpy=True) == Encoder().encode(lines)
+
+
+@pytest.mark.parametrize("filename", coding_fixtures)
+def test_decoding_numpy(filename):
+    np = pytest.importorskip('numpy')
+    geojson = json.loads(open(filename).read())
+    pb = Encoder().encode(geojson)
+    assert Decoder().decode(pb, use_numpy=True) == Decoder().decode(pb)
+
+    def to_lists(obj):
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        elif isinstance(obj, dict):
+            return {k: to_lists(v) for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [to_lists(v) for v in obj]
+        return obj
+
+    assert to_lists(Decoder().decode(pb, as_arrays=True)) == Decoder().decode(pb)
+
+
+def test_decoding_arrays():
+    np = pytest.importorskip('numpy')
+    polygon = {'type': 'Polygon', 'coordinates': [
+        [[0, 0], [1.5, 0], [1.5, 1], [0, 0]],
+        [[0.5, 0.25], [1, 0.25], [1, 0.5], [0.5, 0.25]]]}
+    decoded = Decoder().decode(Encoder().encode(polygon), as_arrays=True)
+    rings = decoded['coordinates']
+    assert [ring.shape for ring in rings] == [(4, 2), (4, 2)]
+    assert rings[0].dtype == np.float64
+    assert rings[1].tolist() == polygon['coordinates'][1]
+
+
+@pytest.mark.parametrize("filename", coding_fixtures)
+def test_encode_stream(filename):
+    geojson = json.loads(open(filename).read())
+    if geojson['type'] != 'FeatureCollection':
+        return
+    fp = io.BytesIO()
+    custom_properties = {k: v for k, v in geojson.items() if k not in ('type', 'features')}
+    Encoder().encode_stream(iter(geojson['features']), fp, custom_properties=custom_properties)
+    assert Decoder().decode(fp.getvalue()) == geojson
+
+
+@pytest.mark.parametrize("filename", coding_fixtures)
+def test_encode_stream_spool(filename):
+    geojson = json.loads(open(filename).read())
+    if geojson['type'] != 'FeatureCollection':
+        return
+    fp = io.BytesIO()
+    features = geojson['features']
+    Encoder().encode_stream(iter(features), fp, spool=True)
+    assert fp.getvalue() == Encoder().encode({'type': 'FeatureCollection', 'features': features})
+
+
+def test_encode_stream_empty():
+    fp = io.BytesIO()
+    with FeatureCollectionWriter(fp, precision=3, dim=3) as writer:
+        pass
+    assert writer.bytes_written == len(fp.getvalue())
+    decoder = Decoder()
+    assert decoder.decode(fp.getvalue()) == {'type': 'FeatureCollection', 'features': []}
+    assert (decoder.data.precision, decoder.data.dimensions) == (3, 3)
+
+
+@pytest.mark.parametrize("filename", coding_fixtures)
+def test_iter_features(filename):
+    geojson = json.loads(open(filename).read())
+    pb = Encoder().encode(geojson)
+    if geojson['type'] == 'FeatureCollection':
+        expected = geojson['features']
+    elif geojson['type'] == 'Feature':
+        expected = [geojson]
+    else:
+        with pytest.raises(ValueError):
+            list(Decoder().iter_features(pb))
+        return
+    assert list(Decoder().iter_features(pb)) == expected
+    assert list(Decoder().iter_features(memoryview(pb))) == expected
+
+
+def test_iter_features_mmap(tmp_path):
+    filename = os.path.join(os.path.dirname(__file__), "fixtures/props.json")
+    geojson = json.loads(open(filename).read())
+    path = str(tmp_path / 'props.pbf')
+    with open(path, 'wb') as f:
+        # keys are written after the features
+        Encoder().encode_stream(geojson['features'], f)
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            features = Decoder().iter_features(m)
+            assert next(features) == geojson['features'][0]
+            assert list(features) == geojson['features'][1:]
+            # stopping early releases the buffer so the mmap can be closed
+            features = Decoder().iter_features(m)
+            next(features)
+            features.close()
@@ -0,0 +1,207 @@
+import glob
+import json
+import os
+
+import pytest
+
+from geobuf import Decoder, Encoder
+
+np = pytest.importorskip('numpy')
+
+fixtures = [f for f in glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', '*.json'))
+            if 'GeometryCollection' not in open(f).read()]
+
+
+def feature_coordinates(geometry, i):
+    """Rebuild the GeoJSON coordinates of feature i from geometry columns."""
+    gt = Decoder.geometry_types[geometry['type'][i]]
+    coords = geometry['coords'].tolist()
+    parts = []
+    for part in range(geometry['geometry_offsets'][i], geometry['geometry_offsets'][i + 1]):
+        rings = []
+        for ring in range(geometry['part_offsets'][part], geometry['part_offsets'][part + 1]):
+            rings.append(coords[geometry['ring_offsets'][ring]:geometry['ring_offsets'][ring + 1]])
+        parts.append(rings)
+    if gt == 'Point':
+        return parts[0][0][0]
+    elif gt in ('MultiPoint', 'LineString'):
+        return parts[0][0]
+    elif gt == 'MultiLineString':
+        return [rings[0] for rings in parts]
+    elif gt == 'Polygon':
+        return parts[0]
+    return parts
+
+
+@pytest.mark.parametrize("filename", fixtures)
+def test_to_columns(filename):
+    geojson = json.loads(open(filename).read())
+    if geojson['type'] not in ('FeatureCollection', 'Feature'):
+        return
+    pbf = Encoder().encode(geojson)
+    decoded = Decoder().decode(pbf)
+    features = decoded['features'] if decoded['type'] == 'FeatureCollection' else [decoded]
+
+    columns = Decoder().to_columns(pbf)
+    geometry = columns['geometry']
+    assert len(geometry['geometry_offsets']) == len(features) + 1
+    for i, feature in enumerate(features):
+        assert columns['id'][i] is np.ma.masked if 'id' not in feature else columns['id'][i] == feature['id']
+        props = {key: column[i] for key, column in columns['properties'].items() if column[i] is not np.ma.masked}
+        assert props == feature.get('properties', {})
+        members = {k: v for k, v in feature.items() if k not in ('type', 'id', 'properties', 'geometry')}
+        assert columns['members'][i] is np.ma.masked if not members else columns['members'][i] == members
+        members = {k: v for k, v in feature['geometry'].items() if k not in ('type', 'coordinates')}
+        assert geometry['members'][i] is np.ma.masked if not members else geometry['members'][i] == members
+        assert Decoder.geometry_types[geometry['type'][i]] == feature['geometry']['type']
+        assert feature_coordinates(geometry, i) == feature['geometry']['coordinates']
+
+
+def test_column_types():
+    features = [
+        {'type': 'Feature', 'id': 'a', 'geometry': {'type': 'Point', 'coordinates': [1, 2]},
+         'properties': {'name': 'x', 'count': 3, 'ratio': 0.5, 'flag': True, 'big': 2 ** 63, 'tags': [1, 2]}},
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [3, 4]},
+         'properties': {'count': -4, 'ratio': 2, 'flag': False, 'mixed': 1}},
+        {'type': 'Feature', 'id': 7, 'geometry': {'type': 'Point', 'coordinates': [5, 6]},
+         'properties': {'name': 'z', 'mixed': 'one'}},
+    ]
+    pbf = Encoder().encode({'type': 'FeatureCollection', 'features': features})
+    columns = Decoder().to_columns(pbf)
+    props = columns['properties']
+    assert list(props) == ['name', 'count', 'ratio', 'flag', 'big', 'tags', 'mixed']
+    assert [props[key].dtype for key in ('name', 'count', 'ratio', 'flag', 'big', 'tags', 'mixed')] == [
+        object, np.int64, np.float64, np.bool_, np.uint64, object, object]
+    assert props['count'].tolist() == [3, -4, None]
+    assert props['ratio'].tolist() == [0.5, 2.0, None]
+    assert props['tags'][0] == [1, 2]
+    assert props['mixed'].tolist() == [None, 1, 'one']
+    assert columns['id'].tolist() == ['a', None, 7]
+    assert columns['geometry']['coords'].tolist() == [[1, 2], [3, 4], [5, 6]]
+
+
+def test_to_columns_offsets():
+    ring = [[0, 0], [1, 0], [1, 1], [0, 0]]
+    geometries = [
+        {'type': 'MultiPolygon', 'coordinates': [[ring, ring], [ring]]},
+        {'type': 'MultiLineString', 'coordinates': [ring[:2], ring[1:]]},
+        {'type': 'Point', 'coordinates': [0.5, 0.5]},
+    ]
+    pbf = Encoder().encode({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': geometry, 'properties': {}} for geometry in geometries]})
+    geometry = Decoder().to_columns(pbf)['geometry']
+    assert geometry['type'].tolist() == [5, 3, 0]
+    assert geometry['geometry_offsets'].tolist() == [0, 2, 4, 5]
+    assert geometry['part_offsets'].tolist() == [0, 2, 3, 4, 5, 6]
+    assert geometry['ring_offsets'].tolist() == [0, 4, 8, 12, 14, 17, 18]
+    assert geometry['coords'].shape == (18, 2)
+
+
+def test_to_columns_options():
+    features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [i, i]},
+                 'properties': {'class': 'ab'[i % 2], 'n': i}} for i in range(6)]
+    pbf = Encoder().encode({'type': 'FeatureCollection', 'features': features})
+    columns = Decoder().to_columns(pbf, properties=['n', 'missing'], where={'class': 'b'}, geometry=False)
+    assert 'geometry' not in columns
+    assert list(columns['properties']) == ['n', 'missing']
+    assert columns['properties']['n'].tolist() == [1, 3, 5]
+    assert columns['properties']['missing'].mask.all()
+
+    with pytest.raises(ValueError):
+        Decoder().to_columns(Encoder().encode({'type': 'Point', 'coordinates': [0, 0]}))
+
+
+@pytest.mark.parametrize("filename", fixtures)
+def test_encode_columns(filename):
+    geojson = json.loads(open(filename).read())
+    if geojson['type'] != 'FeatureCollection':
+        return
+    pbf = Encoder().encode(geojson)
+    custom_properties = {k: v for k, v in geojson.items() if k not in ('type', 'features')}
+    assert Encoder().encode_columns(Decoder().to_columns(pbf), custom_properties=custom_properties) == pbf
+
+
+def test_encode_columns_geojson():
+    ring = [[0, 0], [1.5, 0], [1.5, 1.25], [0, 0]]
+    hole = [[0.5, 0.25], [1, 0.25], [1, 0.5], [0.5, 0.25]]
+    geometries = [
+        {'type': 'Point', 'coordinates': [1.1234567, -2.5]},
+        {'type': 'MultiPoint', 'coordinates': [[1, 2], [3, 4]]},
+        {'type': 'LineString', 'coordinates': [[1, 2], [3, 4], [5, 6.000001]]},
+        {'type': 'MultiLineString', 'coordinates': [[[1, 2], [3, 4]]]},
+        {'type': 'MultiLineString', 'coordinates': [[[1, 2], [3, 4]], [[5, 6], [7, 8], [9, 9]]]},
+        {'type': 'Polygon', 'coordinates': [ring]},
+        {'type': 'Polygon', 'coordinates': [ring, hole]},
+        {'type': 'MultiPolygon', 'coordinates': [[ring]]},
+        {'type': 'MultiPolygon', 'coordinates': [[ring, hole], [ring]]},
+    ]
+    features = [{'type': 'Feature', 'geometry': geometry, 'properties': {}} for geometry in geometries]
+    features[0]['id'] = 'first'
+    features[2]['id'] = 2
+    features[1]['properties'] = {'b': 1.5, 'a': 'x'}
+    features[3]['properties'] = {'a': 'x', 'c': True}
+    features[4]['properties'] = {'b': 2, 'a': 'x', 'c': False}
+    geojson = {'type': 'FeatureCollection', 'features': features}
+
+    def column(values, dtype=None):
+        return np.ma.array(values + [0] * (9 - len(values)), dtype=dtype,
+                           mask=[value is None for value in values] + [True] * (9 - len(values)))
+
+    columns = {
+        'id': column(['first', None, 2], object),
+        'properties': {'b': column([None, 1.5, None, None, 2.0]), 'a': column([None, 'x', None, 'x', 'x'], object),
+                       'c': column([None, None, None, True, False], bool)},
+    }
+    for options in ({}, {'precision': 3}, {'dedupe_values': True}):
+        pbf = Encoder().encode(geojson, **options)
+        columns['geometry'] = Decoder().to_columns(pbf)['geometry']
+        assert Encoder().encode_columns(columns, **options) == pbf
+        assert Decoder().decode(Encoder().encode_columns(columns, **options)) == Decoder().decode(pbf)
+
+
+def test_encode_columns_key_order():
+    # keys are numbered in order of the first row that has them
+    columns = {
+        'properties': {'late': np.ma.array([0, 1], mask=[1, 0]), 'early': np.ma.array([2, 3])},
+        'geometry': {'type': [0, 0], 'geometry_offsets': [0, 1, 2], 'part_offsets': [0, 1, 2],
+                     'ring_offsets': [0, 1, 2], 'coords': np.array([[0.0, 0.0], [1.0, 1.0]])},
+    }
+    encoder = Encoder()
+    pbf = encoder.encode_columns(columns)
+    assert list(encoder.data.keys) == ['early', 'late']
+    assert Decoder().decode(pbf)['features'][1]['properties'] == {'late': 1, 'early': 3}
+
+    # member keys take their place among the keys of the row that first has them
+    columns['members'] = np.ma.array([{'m': 1, 'late': 2}, None], dtype=object, mask=[False, True])
+    columns['geometry']['members'] = np.ma.array([None, {'g': 1}], dtype=object, mask=[True, False])
+    encoder = Encoder()
+    encoder.encode_columns(columns)
+    assert list(encoder.data.keys) == ['early', 'm', 'late', 'g']
+
+
+def test_encode_columns_3d():
+    line = {'type': 'LineString', 'coordinates': [[0, 1, 2], [3, 4.5, 5], [6, 7, 8.25]]}
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': line, 'properties': {}}]}
+    pbf = Encoder().encode(geojson, dim=3)
+    assert Encoder().encode_columns(Decoder().to_columns(pbf), dim=3) == pbf
+    # dim follows the coordinates
+    assert Encoder().encode_columns(Decoder().to_columns(pbf)) == pbf
+    with pytest.raises(ValueError):
+        Encoder().encode_columns(Decoder().to_columns(pbf), dim=2)
+
+
+def test_encode_columns_members():
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [0, 0], 'style': 'x'},
+         'properties': {'b': 1, 'a': 2}, '@type': 'Stop'},
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [1, 1]}, 'properties': {'a': 3}}]}
+    pbf = Encoder().encode(geojson)
+    columns = Decoder().to_columns(pbf)
+    assert columns['members'].tolist() == [{'@type': 'Stop'}, None]
+    assert Decoder().decode(Encoder().encode_columns(columns)) == geojson
+
+    # properties follow column order, not the order of each feature
+    columns['properties'] = {'a': columns['properties']['a'], 'b': columns['properties']['b']}
+    encoded = Encoder().encode_columns(columns)
+    assert encoded != pbf and Decoder().decode(encoded) == geojson
@@ -0,0 +1,98 @@
+import glob
+import json
+import os
+import tracemalloc
+from array import array
+
+import pytest
+
+import geobuf
+from geobuf.compact import CompactDecoder, Feature, FeatureCollection, Geometry
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+@pytest.mark.parametrize("filename", files)
+def test_compact(filename):
+    with open(filename) as f:
+        geojson = json.load(f)
+    for options in ({}, {'auto': True}):
+        pbf = geobuf.encode(geojson, **options)
+        decoded = geobuf.decode(pbf, compact=True)
+        assert decoded.to_geojson() == geobuf.decode(pbf)
+        assert decoded.__geo_interface__ == geobuf.decode(pbf)
+
+
+def test_compact_layout():
+    ring = [[0, 0], [1, 0], [1, 1], [0, 0]]
+    hole = [[0.25, 0.25], [0.5, 0.25], [0.5, 0.5], [0.25, 0.25]]
+    geojson = {'type': 'FeatureCollection', 'name': 'shapes', 'features': [
+        {'type': 'Feature', 'id': 'a', 'geometry': {'type': 'MultiPolygon', 'coordinates': [[ring, hole], [ring]]},
+         'properties': {'n': 1}},
+        {'type': 'Feature', 'geometry': {'type': 'LineString', 'coordinates': ring[:3], 'style': 'dashed'},
+         'properties': {}, 'extra': True},
+    ]}
+    collection = geobuf.decode(geobuf.encode(geojson), compact=True)
+    assert isinstance(collection, FeatureCollection)
+    assert len(collection) == 2 and collection.members == {'name': 'shapes'}
+
+    feature, line_feature = collection
+    assert isinstance(feature, Feature) and isinstance(feature.geometry, Geometry)
+    assert (feature.id, feature.properties, feature.members) == ('a', {'n': 1}, None)
+    geometry = feature.geometry
+    assert geometry.coords == array('d', [c for r in (ring, hole, ring) for p in r for c in p])
+    assert list(geometry.ring_offsets) == [0, 4, 8, 12]
+    assert list(geometry.polygon_offsets) == [0, 2, 3]
+
+    line = line_feature.geometry
+    assert (line_feature.id, line_feature.properties, line_feature.members) == (None, None, {'extra': True})
+    assert line.ring_offsets is None and line.members == {'style': 'dashed'}
+    assert line.coordinates == [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]
+    with pytest.raises(AttributeError):
+        feature.color = 'red'
+    with pytest.raises(ValueError):
+        geobuf.decode(geobuf.encode(geojson), backend='wire', compact=True)
+
+
+def test_compact_docstring_usage():
+    # The usage shown in the geobuf.compact module docstring.
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'LineString', 'coordinates': [[0, 1], [2, 3]]}, 'properties': {}}]}
+    pbf = geobuf.encode(geojson)
+    collection = geobuf.decode(pbf, compact=True)
+    for feature in collection:
+        assert feature.geometry.coords == array('d', [0, 1, 2, 3])
+
+
+def test_compact_options():
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [i, i]}, 'properties': {'i': i, 'j': -i}}
+        for i in range(5)]}
+    collection = CompactDecoder().decode(geobuf.encode(geojson), properties=['i'], geometry=False,
+                                         where=lambda props: props['i'] > 2)
+    assert [feature.to_geojson() for feature in collection] == [
+        {'type': 'Feature', 'geometry': None, 'properties': {'i': 3}},
+        {'type': 'Feature', 'geometry': None, 'properties': {'i': 4}}]
+    features = list(CompactDecoder().iter_features(geobuf.encode(geojson)))
+    assert [feature.geometry.coords for feature in features] == [array('d', [i, i]) for i in range(5)]
+
+    stats = geobuf.Stats()
+    CompactDecoder(stats=stats).decode(geobuf.encode(geojson))
+    assert stats.coords['Point'] == 5 and stats.calls['features'] == 5
+
+
+def test_compact_memory():
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'LineString', 'coordinates': [[i + j / 1000, j] for j in range(500)]},
+         'properties': {'i': i}} for i in range(50)]}
+    pbf = geobuf.encode(geojson)
+
+    def allocated(compact):
+        tracemalloc.start()
+        decoded = geobuf.decode(pbf, compact=compact)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del decoded
+        return size
+
+    assert allocated(True) * 5 < allocated(False)
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+import geobuf
+from geobuf import Decoder, Encoder, parallel
+
+
+@pytest.fixture
+def roads():
+    features = [{
+        'type': 'Feature',
+        'id': i,
+        'geometry': {'type': 'LineString', 'coordinates': [[i, 0], [i, 1]]},
+        'properties': {'class': ['primary', 'secondary', 'track'][i % 3], 'lanes': i % 4, 'name': 'road %d' % i,
+                       'tags': {'surface': 'paved'}},
+    } for i in range(12)]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def decode_all(pbf, **options):
+    """Decode with every decoding path that supports the filter options."""
+    results = [
+        Decoder().decode(pbf, **options),
+        geobuf.decode(pbf, backend='wire', **options),
+        parallel.decode(pbf, jobs=2, chunk_size=5, **options),
+    ]
+    features = list(Decoder().iter_features(pbf, **options))
+    for result in results:
+        assert result == results[0]
+    assert features == results[0]['features']
+    return results[0]
+
+
+def test_properties(roads):
+    pbf = Encoder().encode(roads)
+    decoded = decode_all(pbf, properties=['name', 'lanes', 'missing'])
+    for feature, original in zip(decoded['features'], roads['features']):
+        assert feature['properties'] == {'lanes': original['properties']['lanes'],
+                                         'name': original['properties']['name']}
+        assert feature['geometry'] == original['geometry']
+
+
+def test_no_geometry(roads):
+    pbf = Encoder().encode(roads)
+    decoded = decode_all(pbf, geometry=False)
+    for feature, original in zip(decoded['features'], roads['features']):
+        assert feature['geometry'] is None
+        assert feature['properties'] == original['properties']
+
+
+def test_where_mapping(roads):
+    pbf = Encoder().encode(roads)
+    decoded = decode_all(pbf, where={'class': 'primary', 'lanes': 0})
+    assert [f['id'] for f in decoded['features']] == [0]
+    decoded = decode_all(pbf, where={'class': 'primary'}, properties=['lanes'], geometry=False)
+    assert decoded['features'] == [{'type': 'Feature', 'id': i, 'geometry': None, 'properties': {'lanes': i % 4}}
+                                   for i in range(0, 12, 3)]
+    assert decode_all(pbf, where={'unknown': 1})['features'] == []
+    assert decode_all(pbf, where={'class': 'motorway'})['features'] == []
+
+
+def lanes_over_one(properties):
+    return properties['lanes'] > 1 and 'missing' not in properties
+
+
+def test_where_callable(roads):
+    pbf = Encoder().encode(roads)
+    decoded = decode_all(pbf, where=lanes_over_one)
+    assert [f['id'] for f in decoded['features']] == [i for i in range(12) if i % 4 > 1]
+
+
+def test_where_is_lazy(roads):
+    pbf = Encoder().encode(roads)
+    seen = []
+
+    def where(properties):
+        seen.append(sorted(properties))
+        return properties['class'] == 'track'
+
+    decoder = Decoder()
+    decoded = decoder.decode(pbf, where=where)
+    assert len(decoded['features']) == 4
+    assert seen[0] == ['class', 'lanes', 'name', 'tags']
+    # only the looked-up value is decoded
+    calls = []
+    decode_value = decoder.decode_value
+    decoder.decode_value = lambda val: calls.append(val) or decode_value(val)
+    decoder.decode(pbf, where=where, properties=[], geometry=False)
+    assert len(calls) == 12
+
+
+def test_where_fixture():
+    with open(os.path.join(os.path.dirname(__file__), "fixtures/props.json")) as f:
+        geojson = json.load(f)
+    pbf = Encoder().encode(geojson)
+    assert decode_all(pbf, where=bool) == {'type': 'FeatureCollection', 'features': [
+        f for f in geojson['features'] if f.get('properties')], '@context': geojson['@context'],
+        'foo': geojson['foo'], 'properties': geojson['properties']}
+
+
+def test_where_single():
+    # a single Feature that does not match decodes to None
+    feature = {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [1, 2]}, 'properties': {'i': 4}}
+    pbf = Encoder().encode(feature)
+    for backend in ('protobuf', 'wire'):
+        assert geobuf.decode(pbf, backend=backend, where={'i': 5}) is None
+        assert geobuf.decode(pbf, backend=backend, where={'i': 4}) == feature
+        with pytest.raises(ValueError):
+            geobuf.decode(Encoder().encode(feature['geometry']), backend=backend, where={'i': 4})
+    assert geobuf.decode(pbf, compact=True, where={'i': 5}) is None
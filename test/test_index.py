@@ -0,0 +1,133 @@
+import json
+import os
+
+import pytest
+
+from geobuf import Encoder, FeatureIndex, IndexedReader
+
+
+@pytest.fixture
+def us_states():
+    with open(os.path.join(os.path.dirname(__file__), "fixtures/us-states.json")) as f:
+        return json.load(f)
+
+
+def bbox(geometry):
+    def points(coords):
+        if isinstance(coords[0], (int, float)):
+            yield coords
+        else:
+            for c in coords:
+                yield from points(c)
+    xs, ys = zip(*((p[0], p[1]) for p in points(geometry['coordinates'])))
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def test_index(us_states):
+    pbf = Encoder().encode(us_states)
+    index = FeatureIndex.build(pbf)
+    assert len(index) == len(us_states['features'])
+    for i, feature in enumerate(us_states['features']):
+        assert index.bbox(i) == pytest.approx(bbox(feature['geometry']))
+
+
+def test_index_empty_geometry():
+    collection = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'GeometryCollection', 'geometries': []}},
+        {'type': 'Feature', 'geometry': {'type': 'GeometryCollection', 'geometries': [
+            {'type': 'Point', 'coordinates': [1, 2]},
+            {'type': 'LineString', 'coordinates': [[-1, 5], [3, 0]]}]}},
+    ]}
+    index = FeatureIndex.build(Encoder().encode(collection))
+    assert index.bbox(0) is None
+    assert index.bbox(1) == [-1, 0, 3, 5]
+
+
+def test_save_load(us_states, tmp_path):
+    index = FeatureIndex.build(Encoder().encode(us_states))
+    path = str(tmp_path / 'us-states.pbf.idx')
+    index.save(path)
+    loaded = FeatureIndex.load(path)
+    assert (loaded.precision, loaded.dim, loaded.source_size, loaded.source_digest) == (
+        index.precision, index.dim, index.source_size, index.source_digest)
+    assert loaded.offsets == index.offsets
+    assert loaded.lengths == index.lengths
+    assert loaded.bboxes == index.bboxes
+    assert os.path.getsize(path) == 40 + 48 * len(index)
+
+
+def test_load_invalid(tmp_path):
+    path = tmp_path / 'bad.idx'
+    path.write_bytes(b'not an index')
+    with pytest.raises(ValueError):
+        FeatureIndex.load(str(path))
+
+
+def test_indexed_reader(us_states, tmp_path):
+    path = tmp_path / 'us-states.pbf'
+    path.write_bytes(Encoder().encode(us_states))
+    features = us_states['features']
+    with IndexedReader(str(path), save_index=True) as reader:
+        assert len(reader) == len(features)
+        assert reader[3] == features[3]
+        assert reader[-1] == features[-1]
+        assert reader[10:13] == features[10:13]
+        with pytest.raises(IndexError):
+            reader[len(features)]
+    assert os.path.exists(str(path) + '.idx')
+
+    # the saved sidecar is reused, and rebuilt once the file changes
+    with IndexedReader(str(path)) as reader:
+        assert reader[5] == features[5]
+    path.write_bytes(Encoder().encode({'type': 'FeatureCollection', 'features': features[:2]}))
+    with IndexedReader(str(path)) as reader:
+        assert len(reader) == 2
+
+
+def test_indexed_reader_same_size(tmp_path):
+    # a sidecar of different data of the same size is not reused
+    features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [i, i]}, 'properties': {'n': i}}
+                for i in (1, 22)]
+    path = tmp_path / 'points.pbf'
+    path.write_bytes(Encoder().encode({'type': 'FeatureCollection', 'features': features}))
+    IndexedReader(str(path), save_index=True).close()
+    swapped = Encoder().encode({'type': 'FeatureCollection', 'features': features[::-1]})
+    assert len(swapped) == path.stat().st_size
+    path.write_bytes(swapped)
+    with IndexedReader(str(path)) as reader:
+        assert reader[:] == features[::-1]
+
+    index = FeatureIndex.build(Encoder().encode({'type': 'FeatureCollection', 'features': features}))
+    with pytest.raises(ValueError):
+        IndexedReader(swapped, index=index)
+
+
+def test_indexed_reader_read_only(us_states, tmp_path):
+    path = tmp_path / 'us-states.pbf'
+    path.write_bytes(Encoder().encode(us_states))
+    with IndexedReader(str(path)) as reader:
+        assert reader[1] == us_states['features'][1]
+    assert not os.path.exists(str(path) + '.idx')
+
+
+def test_indexed_reader_stream(us_states, tmp_path):
+    path = tmp_path / 'us-states.pbf'
+    with open(str(path), 'wb') as f:
+        Encoder().encode_stream(us_states['features'], f)
+    reader = IndexedReader(path.read_bytes())
+    assert reader[7] == us_states['features'][7]
+    reader.close()
+
+
+def test_query(us_states, tmp_path):
+    path = tmp_path / 'us-states.pbf'
+    path.write_bytes(Encoder().encode(us_states))
+    box = [-110, 35, -100, 42]
+    expected = [f for f in us_states['features']
+                if not (bbox(f['geometry'])[0] > box[2] or bbox(f['geometry'])[1] > box[3] or
+                        bbox(f['geometry'])[2] < box[0] or bbox(f['geometry'])[3] < box[1])]
+    with IndexedReader(str(path)) as reader:
+        features = reader.query(box)
+        assert features == expected
+        assert {f['properties']['name'] for f in features} >= {'Colorado', 'Utah'}
+        assert reader.query([0, 0, 1, 1]) == []
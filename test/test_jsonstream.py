@@ -0,0 +1,106 @@
+import glob
+import io
+import json
+import os
+
+import pytest
+
+import geobuf
+from geobuf.jsonstream import GeoJSONReader, GeoJSONWriter
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+def write(pbf):
+    fp = io.StringIO()
+    GeoJSONWriter().write(pbf, fp)
+    return fp.getvalue()
+
+
+@pytest.mark.parametrize("filename", files)
+def test_write(filename):
+    with open(filename) as f:
+        geojson = json.load(f)
+    for precision in (0, 3, 6):
+        pbf = geobuf.encode(geojson, precision)
+        text = write(pbf)
+        assert json.loads(text) == geobuf.decode(pbf)
+        assert list(json.loads(text)) == list(geobuf.decode(pbf))
+
+
+def test_write_same_text():
+    with open(os.path.join(os.path.dirname(__file__), "fixtures/us-states.json")) as f:
+        pbf = geobuf.encode(json.load(f))
+    assert write(pbf) == json.dumps(geobuf.decode(pbf))
+
+
+def test_write_stream_encoded():
+    with open(os.path.join(os.path.dirname(__file__), "fixtures/props.json")) as f:
+        geojson = json.load(f)
+    fp = io.BytesIO()
+    geobuf.encode_stream(geojson['features'], fp, custom_properties={'foo': 'bar'})
+    expected = {'type': 'FeatureCollection', 'features': geojson['features'], 'foo': 'bar'}
+    assert json.loads(write(fp.getvalue())) == expected
+
+
+def test_format_coord():
+    writer = GeoJSONWriter()
+    writer.write(geobuf.encode({'type': 'Point', 'coordinates': [0, 0]}), io.StringIO())
+    assert [writer.format_coord(n) for n in (0, 1, -1, 1500000, -1234567, 100)] == \
+        ['0.0', '0.000001', '-0.000001', '1.5', '-1.234567', '0.0001']
+
+
+def read_all(text, chunk_size):
+    reader = GeoJSONReader(io.StringIO(text), chunk_size=chunk_size)
+    if reader.type in ('FeatureCollection', 'FeatureSequence'):
+        return reader.type, list(reader.features()), reader.members
+    return reader.type, reader.value, reader.members
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_reader_collection(chunk_size):
+    with open(os.path.join(os.path.dirname(__file__), "fixtures/props.json")) as f:
+        geojson = json.load(f)
+    members = {k: v for k, v in geojson.items() if k != 'features'}
+    text = json.dumps(geojson, indent=2)
+    assert read_all(text, chunk_size) == ('FeatureCollection', geojson['features'], members)
+
+    # members around the features array, and an empty array
+    text = '{"type": "FeatureCollection", "features": [ ], "n": 12345, "bbox": [1.5, 2]}'
+    assert read_all(text, chunk_size) == ('FeatureCollection', [], {
+        'type': 'FeatureCollection', 'n': 12345, 'bbox': [1.5, 2]})
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_reader_sequence(chunk_size):
+    features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [i, 10.25 * i]},
+                 'properties': {'n': 1234567 * i}} for i in range(5)]
+    expected = ('FeatureSequence', features, {})
+    assert read_all('\n'.join(map(json.dumps, features)) + '\n', chunk_size) == expected
+    assert read_all(''.join('\x1e%s\n' % json.dumps(f) for f in features), chunk_size) == expected
+    assert read_all('\x1e%s\n' % json.dumps(features[0]), chunk_size) == ('FeatureSequence', features[:1], {})
+
+
+def test_reader_single():
+    point = {'type': 'Point', 'coordinates': [1, 2]}
+    assert read_all(json.dumps(point) + '\n', 3) == ('Point', point, {})
+
+
+@pytest.mark.parametrize("text", [
+    "", "0", "[1, 2]", '{"type": "Feature"', '{"features": [{}',
+    # missing, extra and trailing commas
+    '{"features": [{} {}]}', '{"features": [{},]}', '{"features": [, {}]}', '{"features": [{},, {}]}',
+    '{"type": "FeatureCollection" "features": []}', '{"features": [] "n": 1}', '{, "features": []}',
+    '{"type": "Point",}', '{"type": "Point" "coordinates": []}',
+    # anything after a FeatureCollection
+    '{"features": []} {}', '{"features": [{}]}]', '{"features": [], "n": 1}}',
+])
+def test_reader_invalid(text):
+    with pytest.raises(ValueError):
+        read_all(text, 4)
+
+
+def test_reader_trailing_collection_seq():
+    reader = GeoJSONReader(io.StringIO('{"features": []}\n{"type": "Feature"}\n'), sequence=True)
+    with pytest.raises(ValueError):
+        list(reader.features())
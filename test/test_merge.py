@@ -0,0 +1,93 @@
+import glob
+import json
+import os
+
+import pytest
+
+import geobuf
+from geobuf import geobuf_pb2, wire
+from geobuf.encode import remap_keys
+from geobuf.merge import merge
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+def features_of(geojson):
+    return geojson['features'] if geojson['type'] == 'FeatureCollection' else [geojson]
+
+
+def collection(i, **members):
+    features = [{
+        'type': 'Feature',
+        'id': i * 10 + j,
+        'geometry': {'type': 'GeometryCollection', 'geometries': [
+            {'type': 'LineString', 'coordinates': [[i + 0.5, j], [i, j + 0.25]], 'key_%d' % (i + j): j}]},
+        'properties': {'key_%d' % ((i + j) % 4): j, 'name': 'feature %d' % j},
+        'key_%d' % (7 - i): 'custom',
+    } for j in range(3)]
+    obj = {'type': 'FeatureCollection', 'features': features}
+    obj.update(members)
+    return obj
+
+
+@pytest.mark.parametrize("filename", files)
+def test_merge(filename):
+    with open(filename) as f:
+        geojson = json.load(f)
+    if geojson['type'] not in ('FeatureCollection', 'Feature'):
+        with pytest.raises(ValueError):
+            merge([geobuf.encode(geojson)])
+        return
+    pbf = geobuf.encode(geojson)
+    merged = geobuf.decode(merge([pbf, pbf]))
+    assert merged['features'] == features_of(geobuf.decode(pbf)) * 2
+    assert geobuf.decode(merge([pbf, pbf], stream=True)) == merged
+    if geojson['type'] == 'FeatureCollection':
+        # the layout of Encoder.encode: keys, header and one feature collection
+        assert merge([pbf]) == pbf
+
+
+def test_merge_keys():
+    collections = [collection(i, name='part %d' % i, **{'part_%d' % i: True}) for i in range(3)]
+    pbf = merge([geobuf.encode(c) for c in collections])
+    assert geobuf.decode(pbf) == {
+        'type': 'FeatureCollection',
+        'features': sum((c['features'] for c in collections), []),
+        'name': 'part 2', 'part_0': True, 'part_1': True, 'part_2': True,
+    }
+
+    fields = [field_number for field_number, _, _ in wire.iter_fields(pbf)]
+    assert fields == [1] * fields.count(1) + [2, 3, 4]
+
+    # the rewritten features are serialized as protobuf would
+    data = geobuf_pb2.Data.FromString(pbf)
+    for c in collections[1:]:
+        part = geobuf_pb2.Data.FromString(geobuf.encode(c))
+        mapping = [list(data.keys).index(key) for key in part.keys]
+        for feature in part.feature_collection.features:
+            remap_keys(feature, mapping)
+            assert feature.SerializeToString() in pbf
+
+
+def test_merge_precision():
+    low = collection(0)
+    high = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [1.125, -2.5]}, 'properties': {'name': 'x'}}]}
+    pbfs = [geobuf.encode(low, precision=2), geobuf.encode(high, precision=3)]
+    decoder = geobuf.Decoder()
+    merged = decoder.decode(merge(pbfs))
+    assert decoder.data.precision == 3
+    assert merged['features'] == low['features'] + high['features']
+
+    with pytest.raises(ValueError):
+        merge(pbfs, rescale=False)
+    with pytest.raises(ValueError):
+        merge([geobuf.encode(low), geobuf.encode(high, dim=3)])
+
+
+def test_merge_file(tmpdir):
+    path = str(tmpdir.join('merged.pbf'))
+    with open(path, 'wb') as fp:
+        merge([geobuf.encode(collection(i)) for i in range(2)], fp)
+    with open(path, 'rb') as fp:
+        assert geobuf.decode(fp.read())['features'] == collection(0)['features'] + collection(1)['features']
@@ -0,0 +1,51 @@
+import glob
+import json
+import os
+
+import pytest
+
+import geobuf
+from geobuf import parallel
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+@pytest.mark.parametrize("filename", files)
+def test_encode(filename):
+    with open(filename) as f:
+        geojson = json.load(f)
+    assert parallel.encode(geojson, jobs=2, chunk_size=3) == geobuf.encode(geojson)
+
+
+@pytest.mark.parametrize("filename", files)
+def test_decode(filename):
+    with open(filename) as f:
+        pbf = geobuf.encode(json.load(f))
+    assert parallel.decode(pbf, jobs=2, chunk_size=3) == geobuf.decode(pbf)
+
+
+def test_encode_remaps_keys():
+    features = [{
+        'type': 'Feature',
+        'id': i,
+        'geometry': {'type': 'GeometryCollection', 'geometries': [
+            {'type': 'Point', 'coordinates': [i, i], 'key_%d' % (i % 4): i}]},
+        'properties': {'key_%d' % ((i + j) % 5): j for j in range(3)},
+        'key_%d' % (7 - i % 3): 'custom',
+    } for i in range(20)]
+    geojson = {'type': 'FeatureCollection', 'features': features, 'key_9': True}
+    for options in ({}, {'dedupe_values': True}):
+        pbf = parallel.encode(geojson, jobs=3, chunk_size=2, **options)
+        assert pbf == geobuf.encode(geojson, **options)
+        assert parallel.decode(pbf, jobs=3, chunk_size=4) == geojson
+
+
+def test_decode_where_lambda():
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [i, i]}, 'properties': {'i': i}}
+        for i in range(10)]}
+    pbf = geobuf.encode(geojson)
+    for where in (lambda props: props['i'] % 3 == 0, lambda props: False):
+        assert parallel.decode(pbf, jobs=2, chunk_size=2, where=where) == geobuf.decode(pbf, where=where)
+    assert parallel.decode(pbf, jobs=2, where={'i': 4}, geometry=False) == {
+        'type': 'FeatureCollection', 'features': [{'type': 'Feature', 'geometry': None, 'properties': {'i': 4}}]}
@@ -0,0 +1,42 @@
+import random
+
+from geobuf.rtree import PackedRTree, hilbert
+
+
+def brute_force(bboxes, box):
+    min_x, min_y, max_x, max_y = box
+    return [i for i in range(len(bboxes) // 4)
+            if bboxes[4 * i] <= bboxes[4 * i + 2] and
+            not (bboxes[4 * i] > max_x or bboxes[4 * i + 1] > max_y or
+                 bboxes[4 * i + 2] < min_x or bboxes[4 * i + 3] < min_y)]
+
+
+def test_hilbert():
+    assert hilbert(0, 0) == 0
+    values = {hilbert(x, y) for x in range(0, 1 << 16, 4099) for y in range(0, 1 << 16, 4099)}
+    assert len(values) == 16 * 16
+    assert max(values) < 1 << 32
+
+
+def test_search():
+    rng = random.Random(0)
+    bboxes = []
+    for i in range(1000):
+        x, y = rng.randint(-180000000, 180000000), rng.randint(-90000000, 90000000)
+        bboxes.extend((x, y, x + rng.randint(0, 1000000), y + rng.randint(0, 1000000)))
+    bboxes.extend((1, 1, 0, 0))  # no coordinates
+    tree = PackedRTree(bboxes)
+    assert len(tree) == 1000
+    for _ in range(50):
+        x, y = rng.randint(-180000000, 180000000), rng.randint(-90000000, 90000000)
+        box = (x, y, x + rng.randint(0, 50000000), y + rng.randint(0, 50000000))
+        assert tree.search(*box) == brute_force(bboxes, box)
+    assert tree.search(-2 ** 62, -2 ** 62, 2 ** 62, 2 ** 62) == list(range(1000))
+
+
+def test_small_trees():
+    assert PackedRTree([]).search(0, 0, 1, 1) == []
+    assert PackedRTree([1, 1, 0, 0]).search(0, 0, 1, 1) == []
+    tree = PackedRTree([5, 5, 6, 6])
+    assert tree.search(0, 0, 5, 5) == [0]
+    assert tree.search(0, 0, 4, 4) == []
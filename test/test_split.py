@@ -0,0 +1,102 @@
+import glob
+import json
+import os
+
+import pytest
+
+import geobuf
+from geobuf import wire
+from geobuf.merge import merge
+from geobuf.split import quadkey, split
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+def features(n):
+    return {'type': 'FeatureCollection', 'name': 'points', 'features': [{
+        'type': 'Feature',
+        'id': i,
+        'geometry': {'type': 'Point', 'coordinates': [i * 10 - 95, i * 5 - 45], 'key_%d' % (i % 3): i},
+        'properties': {'key_%d' % (i % 4): i, 'name': 'feature %d' % i},
+    } for i in range(n)]}
+
+
+def test_split_count():
+    geojson = features(20)
+    pbf = geobuf.encode(geojson)
+    shards = list(split(pbf, shards=3))
+    assert [name for name, shard in shards] == ['0', '1', '2']
+    decoded = [geobuf.decode(shard) for name, shard in shards]
+    assert [len(d['features']) for d in decoded] == [7, 7, 6]
+    assert sum((d['features'] for d in decoded), []) == geojson['features']
+    assert all(d['name'] == 'points' for d in decoded)
+    assert geobuf.decode(merge([shard for name, shard in shards])) == geobuf.decode(pbf)
+    for name, shard in shards:
+        fields = [field_number for field_number, _, _ in wire.iter_fields(shard)]
+        assert fields == [1] * fields.count(1) + [2, 3, 4]
+
+    decoded = [geobuf.decode(shard) for name, shard in split(pbf, max_features=8)]
+    assert [len(d['features']) for d in decoded] == [8, 8, 4]
+    assert len(list(split(pbf, shards=50))) == 20
+
+
+def test_split_keys():
+    pbf = geobuf.encode(features(20))
+    decoder = geobuf.Decoder()
+    for name, shard in split(pbf, max_features=1):
+        feature = decoder.decode(shard)['features'][0]
+        assert set(decoder.data.keys) == {'name'} | set(feature['properties']) | set(feature['geometry']) - {
+            'type', 'coordinates'}
+
+
+def test_split_bytes():
+    pbf = geobuf.encode(features(30))
+    shards = [shard for name, shard in split(pbf, max_bytes=200)]
+    assert len(shards) > 1
+    assert all(len(shard) < 300 for shard in shards)
+    assert sum((geobuf.decode(shard)['features'] for shard in shards), []) == features(30)['features']
+
+
+def test_split_spatial():
+    geojson = features(20)
+    geojson['features'].append({'type': 'Feature', 'geometry': {'type': 'GeometryCollection', 'geometries': []},
+                                'properties': {'name': 'none'}})
+    pbf = geobuf.encode(geojson)
+    shards = dict(split(pbf, grid=50))
+    assert sorted(shards) == ['-1_-1', '-1_0', '-2_-1', '0_0', '1_0', '1_1', 'empty']
+    for name, shard in shards.items():
+        for feature in geobuf.decode(shard)['features']:
+            if name == 'empty':
+                assert feature['properties'] == {'name': 'none'}
+            else:
+                x, y = feature['geometry']['coordinates']
+                assert name == '%d_%d' % (x // 50, y // 50)
+
+    shards = dict(split(pbf, zoom=2))
+    assert all(len(name) == 2 for name in shards if name != 'empty')
+    assert sum(len(geobuf.decode(shard)['features']) for shard in shards.values()) == 21
+
+
+def test_quadkey():
+    assert quadkey(-179, 84, 1) == '0'
+    assert quadkey(179, -84, 1) == '3'
+    assert quadkey(0.1, 0.1, 3) == '122'
+    assert quadkey(180, -90, 2) == '33'
+
+
+@pytest.mark.parametrize("filename", files)
+def test_split_fixtures(filename):
+    with open(filename) as f:
+        geojson = json.load(f)
+    if geojson['type'] not in ('FeatureCollection', 'Feature'):
+        return
+    pbf = geobuf.encode(geojson)
+    expected = geobuf.decode(merge([pbf]))
+    assert geobuf.decode(merge([shard for name, shard in split(pbf, shards=2)])) == expected
+
+
+def test_split_options():
+    pbf = geobuf.encode(features(2))
+    for options in ({}, {'shards': 2, 'grid': 1}, {'shards': 0}, {'zoom': 0}):
+        with pytest.raises(ValueError):
+            split(pbf, **options)
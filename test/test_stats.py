@@ -0,0 +1,97 @@
+import io
+import json
+
+from click.testing import CliRunner
+
+import geobuf
+from geobuf import Decoder, Encoder, Stats, WireDecoder
+from geobuf.jsonstream import GeoJSONWriter
+from geobuf.scripts.cli import cli
+
+
+def collection():
+    return {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'LineString', 'coordinates': [[0, 0], [1, 1], [2, 2]]},
+         'properties': {'a': 1, 'b': 'x'}},
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [3, 4]}, 'properties': {'a': 2}},
+    ]}
+
+
+def test_encode_stats():
+    stats = Stats()
+    encoder = Encoder(stats=stats)
+    pbf = encoder.encode(collection())
+    assert pbf == Encoder().encode(collection())
+    assert stats.calls['features'] == 2
+    assert stats.calls['keys'] == 3
+    assert stats.calls['values'] == 3
+    assert set(stats.seconds) == {'features', 'properties', 'keys', 'values', 'geometry', 'serialize'}
+    assert stats.coords == {'LineString': 3, 'Point': 1}
+    assert stats.keys == 2
+    assert stats.bytes_written == len(pbf)
+
+    # stats accumulate over calls
+    encoder.encode(collection())
+    assert stats.calls['features'] == 4
+    assert stats.bytes_written == 2 * len(pbf)
+
+
+def test_nested_phases():
+    geometry = {'type': 'GeometryCollection', 'geometries': [
+        {'type': 'Point', 'coordinates': [0, 0]},
+        {'type': 'GeometryCollection', 'geometries': [{'type': 'Point', 'coordinates': [1, 1]}]}]}
+    stats = Stats()
+    Encoder(stats=stats).encode({'type': 'Feature', 'geometry': geometry, 'properties': {}})
+    # nested geometries are timed once but every call is counted
+    assert stats.calls['geometry'] == 4
+    assert stats.calls['features'] == 1
+    assert stats.seconds['geometry'] <= stats.seconds['features']
+    assert stats.coords == {'Point': 2}
+
+
+def test_decode_stats():
+    pbf = Encoder().encode(collection())
+    for decoder in (Decoder, WireDecoder):
+        stats = Stats()
+        assert decoder(stats=stats).decode(pbf) == collection()
+        assert stats.calls['features'] == 2
+        assert stats.calls['values'] == 3
+        assert stats.coords == {'LineString': 3, 'Point': 1}
+        assert stats.keys == 2
+        assert stats.bytes_read == len(pbf)
+
+    stats = Stats()
+    fp = io.StringIO()
+    GeoJSONWriter(stats=stats).write(pbf, fp)
+    assert json.loads(fp.getvalue()) == collection()
+    assert stats.calls['features'] == 2
+    assert stats.coords == {'LineString': 3, 'Point': 1}
+
+
+def test_disabled():
+    # without stats no method is wrapped
+    assert not {'encode_feature', 'serialize'} & set(vars(Encoder()))
+    assert not {'decode_feature', 'parse'} & set(vars(Decoder()))
+
+
+def test_report():
+    stats = Stats()
+    Encoder(stats=stats).encode(collection())
+    report = stats.report()
+    assert report.splitlines()[0].split() == ['phase', 'calls', 'seconds']
+    assert 'LineString 3, Point 1' in report
+    assert stats.as_dict()['calls']['features'] == 2
+
+
+def test_cli_stats():
+    runner = CliRunner()
+    result = runner.invoke(cli, ['encode', '--stats'], input=json.dumps(collection()))
+    assert result.exit_code == 0
+    assert geobuf.decode(result.stdout_bytes) == collection()
+    assert 'features' in result.stderr
+    result = runner.invoke(cli, ['decode', '--stats'], input=result.stdout_bytes)
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == collection()
+    assert 'bytes read' in result.stderr
+    result = runner.invoke(cli, ['encode', '--stats', '--jobs', '2'], input=json.dumps(collection()))
+    assert result.exit_code == 2
@@ -0,0 +1,72 @@
+import glob
+import io
+import json
+import mmap
+import os
+
+import pytest
+
+import geobuf
+from geobuf import Decoder, Encoder, WireDecoder
+
+files = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/*.json"))
+
+
+@pytest.mark.parametrize("filename", files)
+def test_decode(filename):
+    with open(filename) as f:
+        geojson = json.load(f)
+    for options in ({}, {'precision': 2, 'dedupe_values': True}):
+        pbf = Encoder().encode(geojson, **options)
+        expected = Decoder().decode(pbf)
+        assert WireDecoder().decode(pbf) == expected
+        assert WireDecoder().decode(memoryview(pbf)) == expected
+        assert WireDecoder().decode(bytearray(pbf)) == expected
+        assert geobuf.decode(pbf, backend='wire') == expected
+
+
+@pytest.mark.parametrize("filename", files)
+def test_decode_stream_encoded(filename):
+    with open(filename) as f:
+        geojson = json.load(f)
+    if geojson['type'] != 'FeatureCollection':
+        return
+    fp = io.BytesIO()
+    geobuf.encode_stream(geojson['features'], fp, custom_properties={'name': 'test'})
+    assert WireDecoder().decode(fp.getvalue()) == Decoder().decode(fp.getvalue())
+
+
+def test_decode_3d():
+    line = {'type': 'MultiLineString', 'coordinates': [[[0, 0, 1], [1, 2, 3]], [[5, 5, -5], [6, 6, -6], [7, 7, 7]]]}
+    pbf = Encoder().encode(line, dim=3)
+    assert WireDecoder().decode(pbf) == Decoder().decode(pbf) == line
+
+
+def test_values():
+    feature = {
+        'type': 'Feature',
+        'id': -42,
+        'geometry': {'type': 'Point', 'coordinates': [1.5, -2.25]},
+        'properties': {'s': 'ü', 'd': 0.125, 'p': 2 ** 63, 'n': -7, 'b': False, 'j': {'a': [1, None]},
+                       'null': None, 'big': 2 ** 70},
+    }
+    pbf = Encoder().encode(feature)
+    assert WireDecoder().decode(pbf) == Decoder().decode(pbf)
+    feature['id'] = 'x'
+    pbf = Encoder().encode(feature)
+    assert WireDecoder().decode(pbf) == Decoder().decode(pbf)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        geobuf.decode(b'', backend='nope')
+
+
+def test_decode_mmap(tmp_path):
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'id': 'a', 'geometry': {'type': 'Point', 'coordinates': [1, 2]},
+         'properties': {'name': 'x', 'tags': [1, 'b'], 'ratio': 0.5}}]}
+    path = tmp_path / 'point.pbf'
+    path.write_bytes(Encoder().encode(geojson))
+    with open(str(path), 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        assert WireDecoder().decode(m) == geojson